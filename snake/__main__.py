@@ -1,6 +1,7 @@
 import argparse
 
 from snake.game import Game, GameConf, GameMode
+from snake.util.records import FORMATS
 
 
 def main():
@@ -30,12 +31,80 @@ def main():
         choices=dict_mode.keys(),
         help="game mode (default: normal)",
     )
+    parser.add_argument(
+        "--size",
+        type=int,
+        help="number of rows and columns inside the walls (default: 8)",
+    )
+    parser.add_argument(
+        "--episodes",
+        type=int,
+        help="number of benchmark episodes (default: ask for it)",
+    )
+    parser.add_argument(
+        "--steps-limit",
+        type=int,
+        help="number of steps after which a benchmark episode is stopped (default: 5000)",
+    )
+    parser.add_argument(
+        "--loop-repeats",
+        type=int,
+        help="end a benchmark episode as a loop once a state has been seen this many times (default: 0, never)",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        help="seed of the first benchmark episode (default: random)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="number of processes running benchmark episodes (default: one per CPU)",
+    )
+    parser.add_argument(
+        "--output",
+        help="file to write the benchmark records to, '-' for stdout (default: none)",
+    )
+    parser.add_argument(
+        "--format",
+        default="jsonl",
+        choices=FORMATS,
+        help="format of the benchmark records (default: jsonl)",
+    )
+    parser.add_argument(
+        "--instrument",
+        action="store_true",
+        help="time the phases of every step and print their percentiles at the end",
+    )
+    parser.add_argument(
+        "--profile",
+        help="file to dump cProfile stats of the run to, readable by pstats (default: none)",
+    )
+    parser.add_argument(
+        "--stacks",
+        help="file to write sampled call stacks of the run to, in collapsed format for flamegraphs (default: none)",
+    )
     args = parser.parse_args()
 
     conf = GameConf()
     conf.solver_name = dict_solver[args.s]
     conf.mode = dict_mode[args.m]
-    print(f"Solver: {conf.solver_name}   Mode: {conf.mode}")
+    if args.size is not None:
+        conf.map_rows = conf.map_cols = args.size
+    if args.steps_limit is not None:
+        conf.steps_limit = args.steps_limit
+    if args.loop_repeats is not None:
+        conf.loop_repeats = args.loop_repeats
+    conf.benchmark_episodes = args.episodes
+    conf.benchmark_seed = args.seed
+    conf.benchmark_workers = args.workers
+    conf.benchmark_output = args.output
+    conf.benchmark_format = args.format
+    conf.instrument = args.instrument
+    conf.profile_output = args.profile
+    conf.stacks_output = args.stacks
+    if conf.benchmark_output != "-":
+        print(f"Solver: {conf.solver_name}   Mode: {conf.mode}")
 
     Game(conf).run()
 
@@ -0,0 +1,5 @@
+from snake.base.direc import Direc
+from snake.base.map import Map
+from snake.base.point import Point, PointType
+from snake.base.pos import Pos
+from snake.base.snake import Snake
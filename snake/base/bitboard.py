@@ -0,0 +1,154 @@
+import numpy as np
+
+from snake.base.point import PointType
+
+
+def pack(mask):
+    """Pack a boolean array over the map into an int bitset.
+
+    Bit i of the result is set if the flat cell i (x * num_cols + y, see
+    base.map.Map) is marked in the array.
+    """
+    packed = np.packbits(np.asarray(mask, dtype=bool).reshape(-1), bitorder="little")
+    return int.from_bytes(packed.tobytes(), "little")
+
+
+def unpack(bits, num_rows, num_cols):
+    """Unpack an int bitset into a (num_rows, num_cols) boolean array, the inverse of pack()."""
+    size = num_rows * num_cols
+    packed = np.frombuffer(bits.to_bytes((size + 7) // 8, "little"), dtype=np.uint8)
+    return np.unpackbits(packed, count=size, bitorder="little").astype(bool).reshape(num_rows, num_cols)
+
+
+class Bitboard:
+    """Snapshot of a map as int bitsets of its walls, bodies, food and free cells.
+
+    Bit i of every bitset stands for the flat cell i. Moving a set of cells
+    one step left, right, up or down is a shift by 1 or num_cols, so expanding
+    a BFS frontier or counting the neighbors of every cell costs a few big-int
+    operations over the whole board instead of one call per cell. Shifts that
+    wrap around a row end up on the walls, which are never free, so masking
+    the result with the free cells is enough to keep it on the map.
+    """
+
+    def __init__(self, num_rows, num_cols, walls, bodies=0, food=None):
+        """Initialize a Bitboard object.
+
+        Args:
+            num_rows (int): Number of rows of the map, walls included.
+            num_cols (int): Number of columns of the map, walls included.
+            walls (int): Bitset of the walls, including the border.
+            bodies (int): Bitset of the snake's bodies.
+            food (int): Cell index of the food, or None if there is none.
+
+        """
+        self._num_rows = num_rows
+        self._num_cols = num_cols
+        self._all = (1 << (num_rows * num_cols)) - 1
+        self._walls = walls
+        self._bodies = bodies
+        self._food = 0 if food is None else 1 << food
+        self._free = self._all & ~walls & ~bodies
+
+    @classmethod
+    def from_map(cls, game_map):
+        """Take a snapshot of a base.map.Map."""
+        walls = pack(game_map.grid == PointType.WALL.value)
+        return cls(game_map.num_rows, game_map.num_cols, walls, pack(game_map.body_mask()), game_map.food_cell)
+
+    @property
+    def num_rows(self):
+        return self._num_rows
+
+    @property
+    def num_cols(self):
+        return self._num_cols
+
+    @property
+    def walls(self):
+        return self._walls
+
+    @property
+    def bodies(self):
+        return self._bodies
+
+    @property
+    def food(self):
+        return self._food
+
+    @property
+    def free(self):
+        """Bitset of the cells the snake can move to, the food included."""
+        return self._free
+
+    @staticmethod
+    def bit(cell):
+        """Return the bitset holding only a cell index."""
+        return 1 << cell
+
+    @staticmethod
+    def count(bits):
+        """Return the number of cells in a bitset."""
+        return bin(bits).count("1")  # int.bit_count() needs Python 3.10
+
+    @staticmethod
+    def cells(bits):
+        """Yield the cell indices in a bitset in increasing order."""
+        while bits:
+            low = bits & -bits
+            yield low.bit_length() - 1
+            bits ^= low
+
+    def neighbors(self, bits):
+        """Return the bitset of the cells adjacent to any cell in a bitset, walls included."""
+        num_cols = self._num_cols
+        return ((bits << 1) | (bits >> 1) | (bits << num_cols) | (bits >> num_cols)) & self._all
+
+    def expand(self, bits, mask=None):
+        """Return the cells of a mask (the free cells by default) adjacent to any cell in a bitset."""
+        return self.neighbors(bits) & (self._free if mask is None else mask)
+
+    def layers(self, src, mask=None):
+        """Yield the BFS layers from a bitset through a mask (the free cells by default).
+
+        The first layer is src itself, and every next one holds the cells of
+        the mask one step further away, until no new cell is reached.
+        """
+        mask = self._free if mask is None else mask
+        seen = frontier = src
+        while frontier:
+            yield frontier
+            frontier = self.neighbors(frontier) & mask & ~seen
+            seen |= frontier
+
+    def reachable(self, src, mask=None):
+        """Return the bitset of src and the cells of a mask reachable from it."""
+        seen = 0
+        for frontier in self.layers(src, mask):
+            seen |= frontier
+        return seen
+
+    def area(self, cell, mask=None):
+        """Return the number of cells of a mask reachable from a cell, the cell excluded."""
+        return self.count(self.reachable(1 << cell, mask) & ~(1 << cell))
+
+    def dist(self, src, des, mask=None):
+        """Return the number of steps from a cell to another through a mask, or -1 if unreachable."""
+        des_bit = 1 << des
+        for dist, frontier in enumerate(self.layers(1 << src, (self._free if mask is None else mask) | des_bit)):
+            if frontier & des_bit:
+                return dist
+        return -1
+
+    def dead_ends(self, mask=None):
+        """Return the cells of a mask (the free cells by default) with at most one neighbor in it."""
+        mask = self._free if mask is None else mask
+        num_cols = self._num_cols
+        left, right = (mask << 1) & mask, (mask >> 1) & mask
+        up, down = (mask << num_cols) & mask, (mask >> num_cols) & mask
+
+        # Cells marked in at least two of the four shifted masks have two neighbors or more
+        one = left | right
+        two = left & right
+        two |= one & (up | down) | (up & down)
+        return mask & ~two
@@ -1,11 +1,88 @@
+import functools
 import random
 
+import numpy as np
+
+from snake.base.bitboard import Bitboard
 from snake.base.point import Point, PointType
 from snake.base.pos import Pos
 
+# PointType of each uint8 code stored in the grid
+_CODE_TYPES = [None] * 256
+for _t in PointType:
+    _CODE_TYPES[_t.value] = _t
+
+_EMPTY = PointType.EMPTY.value
+_WALL = PointType.WALL.value
+_FOOD = PointType.FOOD.value
+_HEAD_L = PointType.HEAD_L.value
+
+# Whether each uint8 code can be stepped on by the snake
+_SAFE_CODES = bytes(code in (_EMPTY, _FOOD) for code in range(256))
+
+# Column of each uint8 code in the Zobrist key table. The empty code gets the
+# column of zero keys, so that empty cells do not change the hash.
+_KEY_SLOTS = [0] * 256
+for _slot, _t in enumerate(PointType):
+    _KEY_SLOTS[_t.value] = _slot
+_NUM_KEY_SLOTS = len(PointType)
+_ZOBRIST_SEED = 0x5A0B
+
+
+@functools.lru_cache(maxsize=8)
+def _zobrist_keys(num_cells):
+    """Return the flat table of 64-bit Zobrist keys, indexed by cell * _NUM_KEY_SLOTS + slot.
+
+    The keys only depend on the number of cells, so maps of the same size hash
+    the same way in every process.
+    """
+    rng = np.random.default_rng(_ZOBRIST_SEED)
+    keys = np.frombuffer(rng.bytes(8 * num_cells * _NUM_KEY_SLOTS), dtype=np.uint64).reshape(num_cells, -1).copy()
+    keys[:, _KEY_SLOTS[_EMPTY]] = 0
+    return tuple(keys.reshape(-1).tolist())
+
+
+class _MapPoint(Point):
+    """Point that reads and writes its type from a cell of a Map's grid."""
+
+    __slots__ = ("_map", "_cell")
+
+    def __init__(self, game_map, cell):
+        self._map = game_map
+        self._cell = cell
+
+    @property
+    def type(self):
+        return _CODE_TYPES[self._map._cells[self._cell]]
+
+    @type.setter
+    def type(self, val):
+        self._map._set_code(self._cell, val.value)
+
 
 class Map:
-    """2D game map."""
+    """2D game map.
+
+    The type of every point is stored as a uint8 PointType code in one contiguous
+    buffer, row by row. The buffer is shared with a (num_rows, num_cols) numpy array,
+    so point() and the predicates read single codes while grid, safe_mask() and
+    body_mask() expose the whole board at once without copying.
+
+    The empty inside cells are also indexed in a swap-remove list with a
+    cell-to-slot table, which is kept up to date on every type change so that
+    random food can be placed in constant time. Running counts of the food and
+    body cells inside the walls are maintained the same way, which makes
+    is_full(), remaining_capacity() and fill_ratio() constant-time as well.
+
+    Besides Pos, every point can be addressed by its flat cell index
+    x * num_cols + y. The *_cell() methods take and return such indices, and
+    offsets[direc.value] is the index difference to the adjacent cell in a
+    direction, so hot paths can walk the map without creating Pos objects.
+
+    A 64-bit Zobrist hash of the point types is updated on every type change
+    as well. The head and body types encode the snake's direction and how its
+    bodies link up, so the hash identifies the whole state of the game.
+    """
 
     def __init__(self, num_rows, num_cols):
         """Initialize a Map object."""
@@ -17,23 +94,40 @@ class Map:
         self._num_rows = num_rows
         self._num_cols = num_cols
         self._capacity = (num_rows - 2) * (num_cols - 2)
-        self._content = [[Point() for _ in range(num_cols)] for _ in range(num_rows)]
+        self._offsets = (0, -1, -num_cols, 1, num_cols)  # Indexed by Direc.value
+        self._cells = bytearray(num_rows * num_cols)
+        self._grid = np.frombuffer(self._cells, dtype=np.uint8).reshape(num_rows, num_cols)
+        self._grid_view = self._grid.view()
+        self._grid_view.flags.writeable = False
+        self._inside = bytearray(num_rows * num_cols)
+        for i in range(1, num_rows - 1):
+            self._inside[i * num_cols + 1 : (i + 1) * num_cols - 1] = b"\x01" * (num_cols - 2)
+        self._keys = _zobrist_keys(num_rows * num_cols)
         self.reset()
 
     def reset(self):
         self._food = None
-        for i in range(self._num_rows):
-            for j in range(self._num_cols):
-                if i == 0 or i == self._num_rows - 1 or j == 0 or j == self._num_cols - 1:
-                    self._content[i][j].type = PointType.WALL
-                else:
-                    self._content[i][j].type = PointType.EMPTY
+        self._grid.fill(_WALL)
+        self._grid[1:-1, 1:-1] = _EMPTY
+        self._free = [c for c in range(len(self._cells)) if self._inside[c]]
+        self._free_slot = [-1] * len(self._cells)
+        for slot, cell in enumerate(self._free):
+            self._free_slot[cell] = slot
+        self._num_food = 0
+        self._num_body = 0
+        self._hash = 0
+        for cell, code in enumerate(self._cells):
+            self._hash ^= self._keys[cell * _NUM_KEY_SLOTS + _KEY_SLOTS[code]]
 
     def copy(self):
         m_copy = Map(self._num_rows, self._num_cols)
-        for i in range(self._num_rows):
-            for j in range(self._num_cols):
-                m_copy._content[i][j].type = self._content[i][j].type
+        m_copy._cells[:] = self._cells
+        m_copy._free = self._free.copy()
+        m_copy._free_slot = self._free_slot.copy()
+        m_copy._food = self._food
+        m_copy._num_food = self._num_food
+        m_copy._num_body = self._num_body
+        m_copy._hash = self._hash
         return m_copy
 
     @property
@@ -48,10 +142,62 @@ class Map:
     def capacity(self):
         return self._capacity
 
+    @property
+    def offsets(self):
+        """Cell index differences to the adjacent cells, indexed by Direc.value."""
+        return self._offsets
+
     @property
     def food(self):
+        if self._food is None:
+            return None
+        return self.pos(self._food)
+
+    @property
+    def food_cell(self):
         return self._food
 
+    @property
+    def num_empty(self):
+        """Number of empty points inside the walls."""
+        return len(self._free)
+
+    @property
+    def num_food(self):
+        """Number of food points inside the walls."""
+        return self._num_food
+
+    @property
+    def num_body(self):
+        """Number of points inside the walls covered by the snake."""
+        return self._num_body
+
+    @property
+    def zobrist(self):
+        """64-bit Zobrist hash of the point types on the map."""
+        return self._hash
+
+    @property
+    def grid(self):
+        """Read-only (num_rows, num_cols) uint8 array of the PointType codes on the map."""
+        return self._grid_view
+
+    def safe_mask(self):
+        """Return a boolean array marking the inside points that are empty or food."""
+        mask = (self._grid == _EMPTY) | (self._grid == _FOOD)
+        self._mask_border(mask)
+        return mask
+
+    def body_mask(self):
+        """Return a boolean array marking the inside points covered by the snake."""
+        mask = self._grid >= _HEAD_L
+        self._mask_border(mask)
+        return mask
+
+    def bitboard(self):
+        """Return a base.bitboard.Bitboard snapshot of the map."""
+        return Bitboard.from_map(self)
+
     def point(self, pos):
         """Return a point on the map.
 
@@ -65,50 +211,133 @@ class Map:
             snake.point.Point: The point at the given position.
 
         """
-        return self._content[pos.x][pos.y]
+        return _MapPoint(self, pos.x * self._num_cols + pos.y)
+
+    def cell(self, pos):
+        """Return the flat cell index of a position."""
+        return pos.x * self._num_cols + pos.y
+
+    def pos(self, cell):
+        """Return the position of a flat cell index."""
+        return Pos(*divmod(cell, self._num_cols))
+
+    def adj_cell(self, cell, direc):
+        """Return the index of the adjacent cell in a given direction."""
+        return cell + self._offsets[direc.value]
+
+    def cell_type(self, cell):
+        return _CODE_TYPES[self._cells[cell]]
+
+    def set_cell_type(self, cell, point_type):
+        self._set_code(cell, point_type.value)
+
+    def free_slot(self, cell):
+        """Return the slot of an empty cell in the index create_rand_food() picks from, else -1."""
+        return self._free_slot[cell]
+
+    def restore_empty_cell(self, cell, slot):
+        """Empty a cell back into the index slot it was removed from.
+
+        Undoing the removals in reverse order restores the order of the index,
+        so create_rand_food() picks the same cells again for the same RNG state.
+
+        """
+        self._set_code(cell, _EMPTY)
+        last = len(self._free) - 1
+        if 0 <= slot < last:
+            moved = self._free[slot]
+            self._free[slot], self._free[last] = cell, moved
+            self._free_slot[cell], self._free_slot[moved] = slot, last
 
     def is_inside(self, pos):
         return pos.x > 0 and pos.x < self.num_rows - 1 and pos.y > 0 and pos.y < self.num_cols - 1
 
     def is_empty(self, pos):
-        return self.is_inside(pos) and self.point(pos).type == PointType.EMPTY
+        return self.is_inside(pos) and self._cells[pos.x * self._num_cols + pos.y] == _EMPTY
 
     def is_safe(self, pos):
-        return self.is_inside(pos) and (
-            self.point(pos).type == PointType.EMPTY or self.point(pos).type == PointType.FOOD
-        )
+        return self.is_inside(pos) and _SAFE_CODES[self._cells[pos.x * self._num_cols + pos.y]] == 1
+
+    def is_inside_cell(self, cell):
+        return self._inside[cell] == 1
+
+    def is_empty_cell(self, cell):
+        return self._inside[cell] == 1 and self._cells[cell] == _EMPTY
+
+    def is_safe_cell(self, cell):
+        return self._inside[cell] == 1 and _SAFE_CODES[self._cells[cell]] == 1
 
     def is_full(self):
         """Check if the map is filled with the snake's bodies."""
-        for i in range(1, self.num_rows - 1):
-            for j in range(1, self.num_cols - 1):
-                t = self._content[i][j].type
-                if t.value < PointType.HEAD_L.value:
-                    return False
-        return True
+        return self._num_body == self._capacity
+
+    def remaining_capacity(self):
+        """Return the number of inside points not yet covered by the snake."""
+        return self._capacity - self._num_body
+
+    def fill_ratio(self):
+        """Return the fraction of the inside points covered by the snake."""
+        return self._num_body / self._capacity
 
     def has_food(self):
         return self._food is not None
 
     def rm_food(self):
         if self.has_food():
-            self.point(self._food).type = PointType.EMPTY
+            self._set_code(self._food, _EMPTY)
             self._food = None
 
     def create_food(self, pos):
-        self.point(pos).type = PointType.FOOD
-        self._food = pos
-        return self._food
+        self.create_food_cell(self.cell(pos))
+        return pos
+
+    def create_food_cell(self, cell):
+        self._set_code(cell, _FOOD)
+        self._food = cell
+        return cell
 
     def create_rand_food(self):
-        empty_pos = []
-        for i in range(1, self._num_rows - 1):
-            for j in range(1, self._num_cols - 1):
-                t = self._content[i][j].type
-                if t == PointType.EMPTY:
-                    empty_pos.append(Pos(i, j))
-                elif t == PointType.FOOD:
-                    return None  # Stop if food exists
-        if empty_pos:
-            return self.create_food(random.choice(empty_pos))
+        if self._num_food:
+            return None  # Stop if food exists
+        if self._free:
+            return self.pos(self.create_food_cell(random.choice(self._free)))
         return None
+
+    def _set_code(self, cell, code):
+        """Change the PointType code of a cell and keep the index and counters in sync."""
+        old_code = self._cells[cell]
+        if old_code == code:
+            return
+        self._cells[cell] = code
+        slot = cell * _NUM_KEY_SLOTS
+        self._hash ^= self._keys[slot + _KEY_SLOTS[old_code]] ^ self._keys[slot + _KEY_SLOTS[code]]
+        if self._inside[cell]:
+            if old_code == _EMPTY:
+                self._rm_free(cell)
+            elif old_code == _FOOD:
+                self._num_food -= 1
+            elif old_code >= _HEAD_L:
+                self._num_body -= 1
+            if code == _EMPTY:
+                self._add_free(cell)
+            elif code == _FOOD:
+                self._num_food += 1
+            elif code >= _HEAD_L:
+                self._num_body += 1
+
+    def _add_free(self, cell):
+        self._free_slot[cell] = len(self._free)
+        self._free.append(cell)
+
+    def _rm_free(self, cell):
+        slot = self._free_slot[cell]
+        last = self._free.pop()
+        if last != cell:
+            self._free[slot] = last
+            self._free_slot[last] = slot
+        self._free_slot[cell] = -1
+
+    @staticmethod
+    def _mask_border(mask):
+        mask[0, :] = mask[-1, :] = False
+        mask[:, 0] = mask[:, -1] = False
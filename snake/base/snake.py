@@ -7,7 +7,11 @@ from snake.base.pos import Pos
 
 
 class Snake:
-    """Snake of the game."""
+    """Snake of the game.
+
+    The bodies are kept as flat cell indices of the map (see base.map.Map) and
+    only converted to Pos by head(), tail() and bodies.
+    """
 
     def __init__(self, game_map, init_direc=None, init_bodies=None, init_types=None):
         """Initialize a Snake object.
@@ -54,12 +58,12 @@ class Snake:
         self._dead = False
         self._direc = self._init_direc
         self._direc_next = Direc.NONE
-        self._bodies = deque(self._init_bodies)
+        self._bodies = deque(self._map.cell(pos) for pos in self._init_bodies)
 
         if reset_map:
             self._map.reset()
-        for i, pos in enumerate(self._init_bodies):
-            self._map.point(pos).type = self._init_types[i]
+        for i, cell in enumerate(self._bodies):
+            self._map.set_cell_type(cell, self._init_types[i])
 
         if rand_init:
             self._init_direc = self._init_bodies = self._init_types = None
@@ -104,6 +108,11 @@ class Snake:
 
     @property
     def bodies(self):
+        return deque(self._map.pos(cell) for cell in self._bodies)
+
+    @property
+    def body_cells(self):
+        """Flat cell indices of the bodies, from head to tail. Do not modify."""
         return self._bodies
 
     def len(self):
@@ -112,9 +121,19 @@ class Snake:
     def head(self):
         if not self._bodies:
             return None
-        return self._bodies[0]
+        return self._map.pos(self._bodies[0])
 
     def tail(self):
+        if not self._bodies:
+            return None
+        return self._map.pos(self._bodies[-1])
+
+    def head_cell(self):
+        if not self._bodies:
+            return None
+        return self._bodies[0]
+
+    def tail_cell(self):
         if not self._bodies:
             return None
         return self._bodies[-1]
@@ -124,6 +143,58 @@ class Snake:
             self.move(p)
 
     def move(self, new_direc=None):
+        self._move(new_direc, False)
+
+    def apply(self, new_direc=None):
+        """Move the snake like move() and return a token to undo the move.
+
+        Tokens must be passed to revert() in the reverse order of the moves,
+        i.e. only the latest move that has not been reverted can be undone.
+
+        Args:
+            new_direc (base.direc.Direc): The direction to move in.
+
+        Returns:
+            An opaque undo token for revert().
+
+        """
+        return self._move(new_direc, True)
+
+    def revert(self, token):
+        """Undo a move made by apply(), restoring the bodies, map and counters exactly."""
+        direc_next, undo = token
+        if undo is not None:
+            direc, dead, head_type, new_head_type, food, tail, tail_type, free_slot = undo
+            game_map = self._map
+            new_head = self._bodies.popleft()
+            # Undo the map changes in reverse order to restore the empty-cell index too
+            if new_head_type == PointType.EMPTY:
+                game_map.restore_empty_cell(new_head, free_slot)
+            else:
+                game_map.set_cell_type(new_head, new_head_type)
+            if tail is not None:
+                self._bodies.append(tail)
+                game_map.set_cell_type(tail, tail_type)
+            if food is not None:
+                game_map.create_food_cell(food)
+            game_map.set_cell_type(self._bodies[0], head_type)
+            self._direc = direc
+            self._dead = dead
+            self._steps -= 1
+        self._direc_next = direc_next
+
+    def apply_path(self, path):
+        """Apply the moves of a path and return their undo tokens in move order."""
+        return [self.apply(p) for p in path]
+
+    def revert_path(self, tokens):
+        """Undo the moves of apply_path() given the tokens it returned."""
+        for token in reversed(tokens):
+            self.revert(token)
+
+    def _move(self, new_direc, journal):
+        """Move the snake, and with journal return the undo token of the move, else None."""
+        direc_next = self._direc_next
         if new_direc is not None:
             self._direc_next = new_direc
 
@@ -133,27 +204,40 @@ class Snake:
             or self._map.is_full()
             or self._direc_next == Direc.opposite(self._direc)
         ):
-            return
+            return (direc_next, None) if journal else None
 
+        game_map = self._map
         old_head_type, new_head_type = self._new_types()
-        self._map.point(self.head()).type = old_head_type
-        new_head = self.head().adj(self._direc_next)
+        head = self._bodies[0]
+        new_head = game_map.adj_cell(head, self._direc_next)
+        undo = None
+        if journal:
+            undo = [self._direc, self._dead, game_map.cell_type(head), game_map.cell_type(new_head)]
+            undo += [None, None, None, -1]
+        game_map.set_cell_type(head, old_head_type)
         self._bodies.appendleft(new_head)
 
-        if not self._map.is_safe(new_head):
+        if not game_map.is_safe_cell(new_head):
             self._dead = True
-        if self._map.point(new_head).type == PointType.FOOD:
-            self._map.rm_food()
+        if game_map.cell_type(new_head) == PointType.FOOD:
+            if journal and game_map.food_cell == new_head:
+                undo[4] = new_head
+            game_map.rm_food()
         else:
+            if journal:
+                undo[5] = self._bodies[-1]
+                undo[6] = game_map.cell_type(undo[5])
             self._rm_tail()
 
-        self._map.point(new_head).type = new_head_type
+        if journal:
+            undo[7] = game_map.free_slot(new_head)
+        game_map.set_cell_type(new_head, new_head_type)
         self._direc = self._direc_next
         self._steps += 1
+        return (direc_next, undo) if journal else None
 
     def _rm_tail(self):
-        self._map.point(self.tail()).type = PointType.EMPTY
-        self._bodies.pop()
+        self._map.set_cell_type(self._bodies.pop(), PointType.EMPTY)
 
     def _new_types(self):
         old_head_type, new_head_type = None, None
@@ -0,0 +1,259 @@
+import numpy as np
+
+from snake.base.direc import Direc
+from snake.base.point import PointType
+
+_EMPTY = PointType.EMPTY.value
+_WALL = PointType.WALL.value
+_FOOD = PointType.FOOD.value
+_HEAD_L = PointType.HEAD_L.value
+
+# Opposite of each direction, indexed by Direc.value
+_OPPOSITE = np.array([Direc.opposite(Direc(v)).value for v in range(len(Direc))], dtype=np.int8)
+
+# Code of the new head, indexed by Direc.value of the move
+_HEAD_CODES = np.array(
+    [
+        _EMPTY,
+        PointType.HEAD_L.value,
+        PointType.HEAD_U.value,
+        PointType.HEAD_R.value,
+        PointType.HEAD_D.value,
+    ],
+    dtype=np.uint8,
+)
+
+# Code of the old head, indexed by Direc.value of the last and the next move
+_BODY_CODES = np.zeros((len(Direc), len(Direc)), dtype=np.uint8)
+for _body_type, _turns in (
+    (PointType.BODY_HOR, ((Direc.LEFT, Direc.LEFT), (Direc.RIGHT, Direc.RIGHT))),
+    (PointType.BODY_VER, ((Direc.UP, Direc.UP), (Direc.DOWN, Direc.DOWN))),
+    (PointType.BODY_LU, ((Direc.RIGHT, Direc.UP), (Direc.DOWN, Direc.LEFT))),
+    (PointType.BODY_UR, ((Direc.LEFT, Direc.UP), (Direc.DOWN, Direc.RIGHT))),
+    (PointType.BODY_RD, ((Direc.LEFT, Direc.DOWN), (Direc.UP, Direc.RIGHT))),
+    (PointType.BODY_DL, ((Direc.RIGHT, Direc.DOWN), (Direc.UP, Direc.LEFT))),
+):
+    for _direc, _direc_next in _turns:
+        _BODY_CODES[_direc.value, _direc_next.value] = _body_type.value
+
+
+class VecSnake:
+    """A batch of independent snake games stepped together with numpy.
+
+    The K boards are stacked in one (K, num_rows * num_cols) uint8 array of
+    PointType codes laid out like base.map.Map, and the bodies of each snake
+    are kept as flat cell indices in a per-game ring buffer. step() moves all
+    the snakes with the same rules as base.snake.Snake.move(), and food is
+    respawned on every board that has none left.
+    """
+
+    def __init__(self, num_envs, num_rows, num_cols, init_direc=None, init_bodies=None, init_types=None, seed=None):
+        """Initialize a VecSnake object.
+
+        Args:
+            num_envs (int): Number of games K.
+            num_rows (int): Number of rows of each map, walls included.
+            num_cols (int): Number of columns of each map, walls included.
+            init_direc (base.direc.Direc): Initial direction of every snake.
+            init_bodies (list of base.pos.Pos): Initial bodies of every snake.
+            init_types (list of base.point.PointType): Types of each position in init_bodies.
+            seed (int): Seed of the random generator placing the snakes and the food.
+
+        If init_direc is None, every game starts with a random snake of length 2,
+        as base.snake.Snake does.
+        """
+        if num_rows < 5 or num_cols < 5:
+            raise ValueError("'num_rows' and 'num_cols' must >= 5")
+
+        self._num_envs = num_envs
+        self._num_rows = num_rows
+        self._num_cols = num_cols
+        self._capacity = (num_rows - 2) * (num_cols - 2)
+        self._offsets = np.array([0, -1, -num_cols, 1, num_cols], dtype=np.int64)  # Indexed by Direc.value
+        self._init_direc = init_direc
+        self._init_bodies = init_bodies
+        self._init_types = init_types
+        self._rng = np.random.default_rng(seed)
+
+        board = np.full((num_rows, num_cols), _WALL, dtype=np.uint8)
+        board[1:-1, 1:-1] = _EMPTY
+        self._board = board.reshape(-1)
+        self._inside = self._board == _EMPTY
+
+        self._grids = np.empty((num_envs, num_rows * num_cols), dtype=np.uint8)
+        self._grids_view = self._grids.reshape(num_envs, num_rows, num_cols).view()
+        self._grids_view.flags.writeable = False
+        self._bodies = np.zeros((num_envs, self._capacity), dtype=np.int64)
+        self._head = np.zeros(num_envs, dtype=np.int64)  # Slot of the head in the ring buffer
+        self._len = np.zeros(num_envs, dtype=np.int64)
+        self._direc = np.zeros(num_envs, dtype=np.int8)
+        self._steps = np.zeros(num_envs, dtype=np.int64)
+        self._dead = np.zeros(num_envs, dtype=bool)
+        self._food = np.full(num_envs, -1, dtype=np.int64)
+        self._num_body = np.zeros(num_envs, dtype=np.int64)
+        self.reset()
+
+    @property
+    def num_envs(self):
+        return self._num_envs
+
+    @property
+    def num_rows(self):
+        return self._num_rows
+
+    @property
+    def num_cols(self):
+        return self._num_cols
+
+    @property
+    def capacity(self):
+        return self._capacity
+
+    @property
+    def grids(self):
+        """Read-only (K, num_rows, num_cols) uint8 array of the PointType codes."""
+        return self._grids_view
+
+    @property
+    def direc(self):
+        """Direc.value of the last move of each snake."""
+        return self._direc
+
+    @property
+    def steps(self):
+        return self._steps
+
+    @property
+    def dead(self):
+        return self._dead
+
+    @property
+    def food(self):
+        """Cell index of the food on each board, or -1 if there is none."""
+        return self._food
+
+    def lens(self):
+        return self._len.copy()
+
+    def heads(self):
+        """Return the cell index of the head of each snake."""
+        return self._bodies[np.arange(self._num_envs), self._head]
+
+    def tails(self):
+        """Return the cell index of the tail of each snake."""
+        envs = np.arange(self._num_envs)
+        return self._bodies[envs, (self._head + self._len - 1) % self._capacity]
+
+    def bodies(self, env):
+        """Return the cell indices of the bodies of one snake, from head to tail."""
+        slots = (self._head[env] + np.arange(self._len[env])) % self._capacity
+        return self._bodies[env, slots].tolist()
+
+    def is_full(self):
+        return self._num_body == self._capacity
+
+    def reset(self, envs=None):
+        """Reset some games (all by default) to their initial state and place food."""
+        if envs is None:
+            envs = np.arange(self._num_envs)
+        envs = np.asarray(envs, dtype=np.int64).reshape(-1)
+        for env in envs:
+            self._reset_env(env)
+        self._spawn_food(envs)
+
+    def step(self, actions):
+        """Move every snake one step.
+
+        Args:
+            actions (array_like of int): Direc.value of the move of each snake.
+                Direc.NONE.value leaves a snake in place.
+
+        Returns:
+            Three boolean arrays of shape (K,): whether each snake ate the food,
+            died and filled its map in this step.
+
+        """
+        actions = np.asarray(actions, dtype=np.int8)
+        ate = np.zeros(self._num_envs, dtype=bool)
+        died = np.zeros(self._num_envs, dtype=bool)
+
+        envs = np.flatnonzero(
+            ~self._dead & (actions != Direc.NONE.value) & ~self.is_full() & (actions != _OPPOSITE[self._direc])
+        )
+        if envs.size:
+            direc, direc_next = self._direc[envs], actions[envs]
+            heads = self._bodies[envs, self._head[envs]]
+            self._write(envs, heads, _BODY_CODES[direc, direc_next])
+
+            new_heads = heads + self._offsets[direc_next]
+            codes = self._grids[envs, new_heads]
+            safe = self._inside[new_heads] & ((codes == _EMPTY) | (codes == _FOOD))
+            died[envs[~safe]] = True
+            self._dead[envs[~safe]] = True
+
+            self._head[envs] = (self._head[envs] - 1) % self._capacity
+            self._bodies[envs, self._head[envs]] = new_heads
+
+            eat = codes == _FOOD
+            eat_envs = envs[eat]
+            ate[eat_envs] = True
+            self._write(eat_envs, new_heads[eat], _EMPTY)
+            self._food[eat_envs] = -1
+            self._len[eat_envs] += 1
+
+            move_envs = envs[~eat]
+            tail_slots = (self._head[move_envs] + self._len[move_envs]) % self._capacity
+            self._write(move_envs, self._bodies[move_envs, tail_slots], _EMPTY)
+
+            self._write(envs, new_heads, _HEAD_CODES[direc_next])
+            self._direc[envs] = direc_next
+            self._steps[envs] += 1
+
+        self._spawn_food(np.flatnonzero(self._food < 0))
+        return ate, died, self.is_full()
+
+    def _write(self, envs, cells, codes):
+        """Write codes to one cell per game and keep the body counters in sync."""
+        old_codes = self._grids[envs, cells]
+        body_delta = (np.asarray(codes) >= _HEAD_L).astype(np.int64) - (old_codes >= _HEAD_L)
+        self._num_body[envs] += body_delta * self._inside[cells]
+        self._grids[envs, cells] = codes
+
+    def _spawn_food(self, envs):
+        if not envs.size:
+            return
+        empty = (self._grids[envs] == _EMPTY) & self._inside
+        envs, empty = envs[empty.any(axis=1)], empty[empty.any(axis=1)]
+        if not envs.size:
+            return
+        keys = self._rng.random(empty.shape)
+        keys[~empty] = -1.0
+        cells = keys.argmax(axis=1)
+        self._grids[envs, cells] = _FOOD
+        self._food[envs] = cells
+
+    def _reset_env(self, env):
+        if self._init_direc is None:
+            head = self._rng.integers(2, self._num_rows - 2) * self._num_cols + self._rng.integers(
+                2, self._num_cols - 2
+            )
+            direc = Direc(int(self._rng.integers(Direc.LEFT.value, Direc.DOWN.value + 1)))
+            neck = head + self._offsets[_OPPOSITE[direc.value]]
+            body_type = PointType.BODY_HOR if direc in (Direc.LEFT, Direc.RIGHT) else PointType.BODY_VER
+            cells = [head, neck]
+            codes = [_HEAD_CODES[direc.value], body_type.value]
+        else:
+            direc = self._init_direc
+            cells = [pos.x * self._num_cols + pos.y for pos in self._init_bodies]
+            codes = [t.value for t in self._init_types]
+
+        self._grids[env] = self._board
+        self._grids[env, cells] = codes
+        self._bodies[env, : len(cells)] = cells
+        self._head[env] = 0
+        self._len[env] = len(cells)
+        self._direc[env] = direc.value
+        self._steps[env] = 0
+        self._dead[env] = False
+        self._food[env] = -1
+        self._num_body[env] = int(np.count_nonzero(self._grids[env][self._inside] >= _HEAD_L))
@@ -0,0 +1,166 @@
+from snake.base.bitboard import Bitboard, pack
+from snake.base.point import PointType
+
+
+class VirtualMap:
+    """Occupancy of a base.map.Map kept as one int bitset, for virtual moves.
+
+    Bit i of the bitset is set if cell i is blocked, i.e. it is a wall or
+    covered by the snake. Only the queries that path searches need are
+    provided, with the same meaning as on base.map.Map.
+    """
+
+    def __init__(self, game_map):
+        self._map = game_map
+        self._num_rows = game_map.num_rows
+        self._num_cols = game_map.num_cols
+        self._capacity = game_map.capacity
+        self._offsets = game_map.offsets
+        self._food = game_map.food_cell
+        self._num_body = game_map.num_body
+        self._blocked = pack(~game_map.safe_mask())
+
+    @property
+    def num_rows(self):
+        return self._num_rows
+
+    @property
+    def num_cols(self):
+        return self._num_cols
+
+    @property
+    def capacity(self):
+        return self._capacity
+
+    @property
+    def offsets(self):
+        return self._offsets
+
+    @property
+    def food(self):
+        if self._food is None:
+            return None
+        return self.pos(self._food)
+
+    @property
+    def food_cell(self):
+        return self._food
+
+    @property
+    def num_body(self):
+        return self._num_body
+
+    def bitboard(self):
+        """Return a base.bitboard.Bitboard snapshot, taking the walls from the forked map."""
+        walls = pack(self._map.grid == PointType.WALL.value)
+        return Bitboard(self._num_rows, self._num_cols, walls, self._blocked & ~walls, self._food)
+
+    def cell(self, pos):
+        return pos.x * self._num_cols + pos.y
+
+    def pos(self, cell):
+        return self._map.pos(cell)
+
+    def cell_type(self, cell):
+        """Return PointType.FOOD, PointType.EMPTY or PointType.WALL for any blocked cell."""
+        if cell == self._food:
+            return PointType.FOOD
+        return PointType.WALL if self._blocked >> cell & 1 else PointType.EMPTY
+
+    def set_cell_type(self, cell, point_type):
+        """Block or unblock a cell. The snake's bodies and the food are not tracked here."""
+        if point_type == PointType.EMPTY or point_type == PointType.FOOD:
+            self._blocked &= ~(1 << cell)
+        else:
+            self._blocked |= 1 << cell
+
+    def is_inside_cell(self, cell):
+        return self._map.is_inside_cell(cell)
+
+    def is_safe_cell(self, cell):
+        return not self._blocked >> cell & 1
+
+    def is_full(self):
+        return self._num_body == self._capacity
+
+    def has_food(self):
+        return self._food is not None
+
+
+class VirtualSnake:
+    """Copy of a base.snake.Snake that can only move along known paths.
+
+    The bodies are kept as cell indices in a ring buffer on top of a VirtualMap,
+    so forking a live snake costs one pass over its bodies, and moving along a
+    path costs O(path length), without the point type bookkeeping and checks
+    of Snake.move(). Paths are expected to be safe and are not validated.
+    """
+
+    def __init__(self, snake):
+        """Fork a virtual snake from the current state of a snake.
+
+        Args:
+            snake (base.snake.Snake): The snake to copy, which is not changed afterwards.
+
+        """
+        self._map = VirtualMap(snake.map)
+        self._capacity = snake.map.capacity
+        self._ring = [0] * self._capacity
+        self._len = snake.len()
+        self._ring[: self._len] = snake.body_cells
+        self._head = 0  # Slot of the head in the ring buffer
+        self._direc = snake.direc
+        self._steps = snake.steps
+
+    @property
+    def map(self):
+        return self._map
+
+    @property
+    def direc(self):
+        return self._direc
+
+    @property
+    def steps(self):
+        return self._steps
+
+    @property
+    def body_cells(self):
+        """Cell indices of the bodies, from the head to the tail."""
+        return [self._ring[(self._head + i) % self._capacity] for i in range(self._len)]
+
+    def len(self):
+        return self._len
+
+    def head_cell(self):
+        return self._ring[self._head]
+
+    def tail_cell(self):
+        return self._ring[(self._head + self._len - 1) % self._capacity]
+
+    def head(self):
+        return self._map.pos(self.head_cell())
+
+    def tail(self):
+        return self._map.pos(self.tail_cell())
+
+    def move_path(self, path):
+        """Move along a path of base.direc.Direc, eating the food if the path reaches it."""
+        game_map, ring, capacity = self._map, self._ring, self._capacity
+        offsets = game_map.offsets
+        head = ring[self._head]
+        for direc in path:
+            head += offsets[direc.value]
+            if head == game_map._food:
+                game_map._food = None
+                self._len += 1
+                game_map._num_body += 1
+            else:
+                tail = ring[(self._head + self._len - 1) % capacity]
+                game_map._blocked &= ~(1 << tail)
+            game_map._blocked |= 1 << head
+            self._head = (self._head - 1) % capacity
+            ring[self._head] = head
+        if path:
+            self._direc = path[-1]
+        self._steps += len(path)
@@ -1,12 +1,35 @@
+from collections import namedtuple
 from enum import Enum, unique
 import errno
+import multiprocessing
 import os
+import random
+import time
 import traceback
 
 from snake.base import Direc, Map, PointType, Pos, Snake
 from snake.gui import GameWindow
+from snake.replay import ReplayWriter, ascii_frame
+from snake.util.profiling import PERCENTILES, PhaseTimer, Profiler
+from snake.util.records import RecordWriter
+from snake.util.transposition import TranspositionTable
 
-# Add solver names to globals()
+# Add solver names to globals(). DQNSolver needs tensorflow, so _solver_class() only imports it when asked for.
+from snake.solver import GreedySolver, HamiltonSolver  # noqa: F401
+
+# Outcome of one benchmark episode. status is "FULL", "DEAD", "STEP LIMIT" or "LOOP",
+# wall_time is in seconds and phases is the PhaseTimer of the episode's steps, whose
+# "solver" phase holds the time spent in every next_direc() call.
+EpisodeResult = namedtuple("EpisodeResult", ["episode", "seed", "status", "length", "steps", "wall_time", "phases"])
+
+# Columns of the benchmark records. Episode records leave the summary-only ones empty and vice versa.
+# The solver latency percentiles are the ones PhaseTimer reports.
+_RECORD_FIELDS = (
+    ["type", "solver", "map_rows", "map_cols", "episode", "seed", "status", "length", "steps"]
+    + ["episodes", "avg_length", "avg_steps", "wall_time_s", "steps_per_sec"]
+    + [f"latency_p{p}_ms" for p in PERCENTILES]
+    + ["latency_max_ms"]
+)
 
 
 @unique
@@ -26,6 +49,23 @@ class GameConf:
 
         # Solver
         self.solver_name = "HamiltonSolver"  # Class name of the solver
+        self.solver_kwargs = {}  # Extra keyword arguments of the solver, e.g. {"cache_dir": ...}
+
+        # Benchmark
+        self.loop_repeats = 0  # End an episode once a state has been seen this many times, 0 to never
+        self.loop_table_size = 1 << 16  # Number of states remembered for the loop detection
+        self.steps_limit = 5000  # Number of steps after which an episode is stopped
+        self.benchmark_episodes = None  # Number of episodes, None to ask for it
+        self.benchmark_workers = None  # Number of processes running episodes, None for one per CPU
+        self.benchmark_seed = None  # Seed of the first episode, the next ones add their index to it
+        self.benchmark_output = None  # Path of the records of every episode and the summary, "-" for stdout
+        self.benchmark_format = "jsonl"  # Format of the records, "jsonl" or "csv"
+
+        # Instrumentation
+        self.instrument = False  # Time the phases of every step into histograms, reported at the end
+        self.profile_output = None  # Path of a cProfile stats file of the whole run
+        self.stacks_output = None  # Path of a collapsed-stack file of the whole run, for flamegraphs
+        self.stacks_interval = 0.001  # Seconds of CPU time between two stack samples
 
         # Size
         self.map_rows = 8
@@ -63,7 +103,12 @@ class GameConf:
         self.font_info = ("Arial", 9)
 
         # Info
-        self.info_str = (
+        self.info_status = ["eating", "dead", "full"]
+
+    @property
+    def info_str(self):
+        """Format of the info panel, built from the map size when read so that later size changes show."""
+        return (
             "<w/a/s/d>: snake direction\n"
             "<space>: pause/resume\n"
             "<r>: restart    <esc>: exit\n"
@@ -73,18 +118,26 @@ class GameConf:
             "length: %d/%d (" + str(self.map_rows) + "x" + str(self.map_cols) + ")\n"
             "-----------------------------------"
         )
-        self.info_status = ["eating", "dead", "full"]
 
 
 class Game:
-    def __init__(self, conf):
+    def __init__(self, conf, log=True):
         self._conf = conf
-        self._map = Map(conf.map_rows + 2, conf.map_cols + 2)
-        self._snake = Snake(self._map, conf.init_direc, conf.init_bodies, conf.init_types)
+        self._init_play()
         self._pause = False
-        self._solver = globals()[self._conf.solver_name](self._snake)
         self._episode = 1
-        self._init_log_file()
+        self._timer = PhaseTimer(conf.solver_name) if conf.instrument else None
+        self._log_file = None
+        self._replay = None
+        if log:
+            self._init_log_file()
+
+    def _init_play(self):
+        """Create the map, the snake and the solver of a new game."""
+        conf = self._conf
+        self._map = Map(conf.map_rows + 2, conf.map_cols + 2)
+        self._snake = Snake(self._map, conf.init_direc, conf.init_bodies, conf.init_types)
+        self._solver = _solver_class(conf.solver_name)(self._snake, **conf.solver_kwargs)
 
     @property
     def snake(self):
@@ -95,6 +148,13 @@ class Game:
         return self._episode
 
     def run(self):
+        conf = self._conf
+        with Profiler(conf.profile_output, conf.stacks_output, conf.stacks_interval):
+            self._run_mode()
+        if self._timer and conf.benchmark_output != "-":
+            print(self._timer.report())
+
+    def _run_mode(self):
         if self._conf.mode == GameMode.BENCHMARK:
             self._run_benchmarks()
         elif self._conf.mode == GameMode.TRAIN_DQN:
@@ -123,37 +183,128 @@ class Game:
                 self._plot_history()
 
     def _run_benchmarks(self):
-        steps_limit = 5000
-        num_episodes = int(input("Please input the number of episodes: "))
-
-        print(f"\nMap size: {self._conf.map_rows}x{self._conf.map_cols}")
-        print(f"Solver: {self._conf.solver_name[:-6].lower()}\n")
+        conf = self._conf
+        num_episodes = conf.benchmark_episodes
+        if num_episodes is None:
+            num_episodes = int(input("Please input the number of episodes: "))
+
+        # Records sent to stdout replace the text report
+        verbose = conf.benchmark_output != "-"
+        writer = None
+        if conf.benchmark_output is not None:
+            writer = RecordWriter(conf.benchmark_output, conf.benchmark_format, _RECORD_FIELDS)
+        header = {"solver": conf.solver_name, "map_rows": conf.map_rows, "map_cols": conf.map_cols}
+
+        if verbose:
+            print(f"\nMap size: {conf.map_rows}x{conf.map_cols}")
+            print(f"Solver: {conf.solver_name[:-6].lower()}\n")
 
         tot_len, tot_steps = 0, 0
+        timer = PhaseTimer(conf.solver_name)  # Phases of all the episodes
+        start = time.perf_counter()
+        try:
+            for result in self._benchmark_results(num_episodes):
+                if verbose:
+                    print(f"Episode {result.episode} - {result.status} (len: {result.length} | steps: {result.steps})")
+                if writer:
+                    writer.write(
+                        {
+                            "type": "episode",
+                            **header,
+                            "episode": result.episode,
+                            "seed": result.seed,
+                            "status": result.status,
+                            "length": result.length,
+                            "steps": result.steps,
+                            **_speed_stats(result.steps, result.wall_time, result.phases),
+                        }
+                    )
+                tot_len += result.length
+                tot_steps += result.steps
+                timer.merge(result.phases)
+            wall_time = time.perf_counter() - start
+
+            avg_len = tot_len / num_episodes
+            avg_steps = tot_steps / num_episodes
+            if verbose:
+                print(f"\n[Summary]\nAverage Length: {avg_len:.2f}\nAverage Steps: {avg_steps:.2f}\n")
+            if writer:
+                summary = {
+                    "type": "summary",
+                    **header,
+                    "episodes": num_episodes,
+                    "avg_length": avg_len,
+                    "avg_steps": avg_steps,
+                    **_speed_stats(tot_steps, wall_time, timer),
+                }
+                if self._timer:
+                    summary["phases"] = timer.stats()
+                writer.write(summary)
+        finally:
+            if writer:
+                writer.close()
+            if self._timer:
+                self._timer.merge(timer)
 
-        for _ in range(num_episodes):
-            print(f"Episode {self._episode} - ", end="")
-            while True:
-                self._game_main_normal()
-                if self._map.is_full():
-                    print(f"FULL (len: {self._snake.len()} | steps: {self._snake.steps})")
-                    break
-                if self._snake.dead:
-                    print(f"DEAD (len: {self._snake.len()} | steps: {self._snake.steps})")
-                    break
-                if self._snake.steps >= steps_limit:
-                    print(f"STEP LIMIT (len: {self._snake.len()} | steps: {self._snake.steps})")
-                    self._write_logs()  # Write the last step
-                    break
-            tot_len += self._snake.len()
-            tot_steps += self._snake.steps
-            self._reset()
+        self._on_exit()
 
-        avg_len = tot_len / num_episodes
-        avg_steps = tot_steps / num_episodes
-        print(f"\n[Summary]\nAverage Length: {avg_len:.2f}\nAverage Steps: {avg_steps:.2f}\n")
+    def _benchmark_results(self, num_episodes):
+        """Run benchmark episodes and yield their EpisodeResult as soon as each one ends.
+
+        Every episode runs on its own Map, Snake and solver, created after
+        seeding with the episode's seed, so its result only depends on the seed.
+        With more than one worker, the episodes are spread over a process pool,
+        and results come back in the order the episodes end.
+        """
+        base_seed = self._conf.benchmark_seed
+        if base_seed is None:
+            base_seed = random.randrange(1 << 32)
+        jobs = [(self._conf, self._episode + i, base_seed + i) for i in range(num_episodes)]
+
+        num_workers = min(self._conf.benchmark_workers or os.cpu_count() or 1, num_episodes)
+        if self._conf.profile_output or self._conf.stacks_output:
+            num_workers = 1  # The profilers only see this process
+        if num_workers <= 1:
+            for _, episode, seed in jobs:
+                # Start over from a new game, as a worker process does
+                random.seed(seed)
+                self._solver.close()
+                self._init_play()
+                self._episode = episode
+                yield self._run_episode(seed)
+            self._episode += 1
+            return
 
-        self._on_exit()
+        with multiprocessing.Pool(num_workers) as pool:
+            yield from pool.imap_unordered(_run_benchmark_episode, jobs)
+        self._episode += num_episodes
+
+    def _run_episode(self, seed=None):
+        """Play the current episode until it ends and return its EpisodeResult."""
+        steps_limit = self._conf.steps_limit
+        seen = TranspositionTable(self._conf.loop_table_size) if self._conf.loop_repeats > 0 else None
+        # The steps are always timed, into a timer of their own
+        timer, self._timer = self._timer, PhaseTimer(self._conf.solver_name)
+        start = time.perf_counter()
+        while True:
+            self._game_main_normal()
+            if self._map.is_full():
+                status = "FULL"
+                break
+            if self._snake.dead:
+                status = "DEAD"
+                break
+            if self._snake.steps >= steps_limit:
+                status = "STEP LIMIT"
+                self._write_logs()  # Write the last step
+                break
+            if self._is_loop(seen):
+                status = "LOOP"
+                self._write_logs()  # Write the last step
+                break
+        wall_time = time.perf_counter() - start
+        phases, self._timer = self._timer, timer
+        return EpisodeResult(self._episode, seed, status, self._snake.len(), self._snake.steps, wall_time, phases)
 
     def _run_dqn_train(self):
         try:
@@ -181,21 +332,44 @@ class Game:
         return learn_end
 
     def _game_main_normal(self):
+        timer = self._timer
+        # Every phase is timed when instrumenting, else only the solver's for the benchmark latencies
+        phases = timer if self._conf.instrument else None
+        if phases:
+            phases.start()
+
         if not self._map.has_food():
             self._map.create_rand_food()
+            if self._replay and self._map.has_food():
+                self._replay.food(self._map.food_cell)
+            if phases:
+                phases.lap("food")
 
         if self._pause or self._is_episode_end():
             return
 
-        self._update_direc(self._solver.next_direc())
+        if phases:
+            phases.lap("checks")
+        elif timer:
+            timer.start()
+        new_direc = self._solver.next_direc()
+        if timer:
+            timer.lap("solver")
+        self._update_direc(new_direc)
 
-        if self._conf.mode == GameMode.NORMAL and self._snake.direc_next != Direc.NONE:
-            self._write_logs()
+        if self._replay and self._snake.direc_next != Direc.NONE:
+            self._replay.step(self._snake.direc_next)
+            if phases:
+                phases.lap("log")
 
         self._snake.move()
+        if phases:
+            phases.lap("move")
 
         if self._is_episode_end():
             self._write_logs()  # Write the last step
+            if phases:
+                phases.lap("log")
 
     def _plot_history(self):
         self._solver.plot()
@@ -203,30 +377,50 @@ class Game:
     def _update_direc(self, new_direc):
         self._snake.direc_next = new_direc
         if self._pause:
+            if self._replay and new_direc != Direc.NONE:
+                self._replay.step(new_direc)
             self._snake.move()
 
     def _toggle_pause(self):
         self._pause = not self._pause
 
+    def _is_loop(self, seen):
+        """Count a visit to the current state and check if the solver is going around in circles."""
+        if self._conf.loop_repeats <= 0:
+            return False
+        key = self._map.zobrist
+        visits = seen.get(key, 0) + 1
+        seen.put(key, visits)
+        return visits >= self._conf.loop_repeats
+
     def _is_episode_end(self):
         return self._snake.dead or self._map.is_full()
 
     def _reset(self):
         self._snake.reset()
         self._episode += 1
+        if self._replay:
+            self._replay.episode(self._episode, self._snake)
 
     def _on_exit(self):
         if self._log_file:
             self._log_file.close()
+        if self._replay:
+            self._replay.close()
         if self._solver:
             self._solver.close()
 
     def _init_log_file(self):
+        """Open the replay of the games in normal mode, or the text log of the last steps otherwise."""
         try:
             os.makedirs("logs")
         except OSError as e:
             if e.errno != errno.EEXIST:
                 raise
+        if self._conf.mode == GameMode.NORMAL:
+            self._replay = ReplayWriter("logs/snake.replay", self._map.num_rows, self._map.num_cols)
+            self._replay.episode(self._episode, self._snake)
+            return
         try:
             self._log_file = None
             self._log_file = open("logs/snake.log", "w", encoding="utf-8")
@@ -235,23 +429,41 @@ class Game:
                 self._log_file.close()
 
     def _write_logs(self):
-        self._log_file.write(f"[ Episode {self._episode} / Step {self._snake.steps} ]\n")
-        for i in range(self._map.num_rows):
-            for j in range(self._map.num_cols):
-                pos = Pos(i, j)
-                t = self._map.point(pos).type
-                if t == PointType.EMPTY:
-                    self._log_file.write("  ")
-                elif t == PointType.WALL:
-                    self._log_file.write("# ")
-                elif t == PointType.FOOD:
-                    self._log_file.write("F ")
-                elif t == PointType.HEAD_L or t == PointType.HEAD_U or t == PointType.HEAD_R or t == PointType.HEAD_D:
-                    self._log_file.write("H ")
-                elif pos == self._snake.tail():
-                    self._log_file.write("T ")
-                else:
-                    self._log_file.write("B ")
-            self._log_file.write("\n")
-        self._log_file.write(f"[ last/next direc: {self._snake.direc}/{self._snake.direc_next} ]\n")
-        self._log_file.write("\n")
+        if not self._log_file:
+            return
+        self._log_file.write(ascii_frame(self._episode, self._snake) + "\n")
+
+
+def _solver_class(name):
+    """Return the solver class of a name."""
+    if name == "DQNSolver":
+        from snake.solver.dqn import DQNSolver
+
+        return DQNSolver
+    return globals()[name]
+
+
+def _speed_stats(steps, wall_time, timer):
+    """Return the record fields of the wall time, steps per second and solver latency percentiles.
+
+    The latencies are the "solver" phase of a PhaseTimer, so they match its report.
+    """
+    stats = {"wall_time_s": wall_time, "steps_per_sec": steps / wall_time if wall_time > 0 else 0.0}
+    solver = timer.stats().get("solver")
+    if solver:
+        for p in PERCENTILES:
+            stats[f"latency_p{p}_ms"] = solver[f"p{p}_us"] / 1000
+        stats["latency_max_ms"] = solver["max_us"] / 1000
+    return stats
+
+
+def _run_benchmark_episode(job):
+    """Play one benchmark episode in a worker process, with no log file."""
+    conf, episode, seed = job
+    random.seed(seed)
+    game = Game(conf, log=False)
+    game._episode = episode
+    try:
+        return game._run_episode(seed)
+    finally:
+        game._on_exit()
@@ -0,0 +1,202 @@
+import argparse
+import queue
+import struct
+import threading
+
+from snake.base.direc import Direc
+from snake.base.map import Map
+from snake.base.point import PointType
+from snake.base.snake import Snake
+
+# File layout:
+#   header:  MAGIC, version (u8), num_rows (u16), num_cols (u16)
+#   then a stream of records, each starting with one byte:
+#   0-4      a step, the byte being the Direc.value the snake moved in
+#   EPISODE  episode (u32), direc (u8), number of bodies (u32), then cell (u32) and type (u8) of every body
+#   FOOD     cell (u32) of a new food
+MAGIC = b"SNKR"
+VERSION = 1
+EPISODE = 0x80
+FOOD = 0x81
+
+_HEADER = struct.Struct("<4sBHH")
+_EPISODE = struct.Struct("<IBI")
+_BODY = struct.Struct("<IB")
+_CELL = struct.Struct("<I")
+
+_DIRECS = tuple(Direc)  # Indexed by Direc.value
+_TYPES = {t.value: t for t in PointType}
+
+
+class ReplayWriter:
+    """Record games as a compact binary replay, written on a background thread.
+
+    Every episode stores the initial snake once, and then costs one byte per
+    step and five bytes per food. Records are appended to an in-memory buffer,
+    and full buffers are handed to a writer thread, so the game loop never
+    waits on the file.
+    """
+
+    def __init__(self, path, num_rows, num_cols, buffer_size=1 << 16):
+        """Initialize a ReplayWriter object.
+
+        Args:
+            path (str): Path of the replay file, which is overwritten.
+            num_rows (int): Number of rows of the map, walls included.
+            num_cols (int): Number of columns of the map, walls included.
+            buffer_size (int): Number of bytes buffered before they are sent to the writer thread.
+
+        """
+        self._file = open(path, "wb")
+        self._buffer_size = buffer_size
+        self._buffer = bytearray(_HEADER.pack(MAGIC, VERSION, num_rows, num_cols))
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._write_loop, name="ReplayWriter", daemon=True)
+        self._thread.start()
+
+    def episode(self, episode, snake):
+        """Record the start of an episode with the snake's initial state."""
+        game_map = snake.map
+        cells = snake.body_cells
+        self._buffer.append(EPISODE)
+        self._buffer += _EPISODE.pack(episode, snake.direc.value, len(cells))
+        for cell in cells:
+            self._buffer += _BODY.pack(cell, game_map.cell_type(cell).value)
+        self._check_flush()
+
+    def food(self, cell):
+        self._buffer.append(FOOD)
+        self._buffer += _CELL.pack(cell)
+        self._check_flush()
+
+    def step(self, direc):
+        self._buffer.append(direc.value)
+        if len(self._buffer) >= self._buffer_size:
+            self.flush()
+
+    def flush(self):
+        """Hand the buffered records to the writer thread."""
+        if self._buffer:
+            self._queue.put(bytes(self._buffer))
+            self._buffer.clear()
+
+    def close(self):
+        """Write all the records and wait for the writer thread to finish."""
+        self.flush()
+        self._queue.put(None)
+        self._thread.join()
+        self._file.close()
+
+    def _check_flush(self):
+        if len(self._buffer) >= self._buffer_size:
+            self.flush()
+
+    def _write_loop(self):
+        while True:
+            data = self._queue.get()
+            if data is None:
+                break
+            self._file.write(data)
+
+
+def read_replay(path):
+    """Yield the records of a replay file.
+
+    Yields:
+        ("header", (num_rows, num_cols)) first, and then ("episode", (episode,
+        direc, cells, types)), ("food", cell) and ("step", direc) tuples in
+        the order they were recorded.
+
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, version, num_rows, num_cols = _HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"'{path}' is not a version {VERSION} snake replay")
+    yield "header", (num_rows, num_cols)
+
+    pos = _HEADER.size
+    while pos < len(data):
+        tag = data[pos]
+        pos += 1
+        if tag < len(_DIRECS):
+            yield "step", _DIRECS[tag]
+        elif tag == EPISODE:
+            episode, direc, num_bodies = _EPISODE.unpack_from(data, pos)
+            pos += _EPISODE.size
+            cells, types = [], []
+            for _ in range(num_bodies):
+                cell, code = _BODY.unpack_from(data, pos)
+                pos += _BODY.size
+                cells.append(cell)
+                types.append(_TYPES[code])
+            yield "episode", (episode, _DIRECS[direc], cells, types)
+        elif tag == FOOD:
+            yield "food", _CELL.unpack_from(data, pos)[0]
+            pos += _CELL.size
+        else:
+            raise ValueError(f"unknown replay record {tag:#x} at byte {pos - 1}")
+
+
+def replay_frames(path):
+    """Replay a recorded game and yield its ASCII view before every step and at the end of every episode.
+
+    The frames look like the text logs the game used to write, one per move.
+    """
+    game_map, snake, episode = None, None, 0
+    for kind, value in read_replay(path):
+        if kind == "header":
+            num_rows, num_cols = value
+        elif kind == "episode":
+            if snake is not None:
+                yield ascii_frame(episode, snake)
+            episode, direc, cells, types = value
+            game_map = Map(num_rows, num_cols)
+            snake = Snake(game_map, direc, [game_map.pos(cell) for cell in cells], types)
+        elif kind == "food":
+            game_map.create_food_cell(value)
+        else:
+            snake.direc_next = value
+            yield ascii_frame(episode, snake)
+            snake.move()
+    if snake is not None:
+        yield ascii_frame(episode, snake)
+
+
+def ascii_frame(episode, snake):
+    """Return the text view of the map and the snake's directions, as in the game's text logs."""
+    game_map = snake.map
+    head, tail = snake.head_cell(), snake.tail_cell()
+    lines = [f"[ Episode {episode} / Step {snake.steps} ]"]
+    for i in range(game_map.num_rows):
+        row = []
+        for j in range(game_map.num_cols):
+            cell = i * game_map.num_cols + j
+            t = game_map.cell_type(cell)
+            if t == PointType.EMPTY:
+                row.append("  ")
+            elif t == PointType.WALL:
+                row.append("# ")
+            elif t == PointType.FOOD:
+                row.append("F ")
+            elif cell == head:
+                row.append("H ")
+            elif cell == tail:
+                row.append("T ")
+            else:
+                row.append("B ")
+        lines.append("".join(row))
+    lines.append(f"[ last/next direc: {snake.direc}/{snake.direc_next} ]")
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print the ASCII view of a recorded snake game.")
+    parser.add_argument("path", nargs="?", default="logs/snake.replay", help="replay file (default: %(default)s)")
+    args = parser.parse_args()
+    for frame in replay_frames(args.path):
+        print(frame)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,3 @@
+from snake.solver.greedy import GreedySolver
+from snake.solver.hamilton import HamiltonSolver
+from snake.solver.path import PathSolver
@@ -0,0 +1,228 @@
+import itertools
+import random
+
+# Kinds of cycles build_cycle() can construct
+KINDS = ("zigzag", "tree")
+
+
+def zigzag_cycle(num_rows, num_cols):
+    """Build a zig-zag hamiltonian cycle on the inside of a map.
+
+    The cycle runs right along the first row, sweeps back and forth over the
+    other rows without entering the first column, and returns up along the
+    first column.
+
+    Args:
+        num_rows (int): Number of rows of the map, walls included. Must be even.
+        num_cols (int): Number of columns of the map, walls included.
+
+    Returns:
+        A list indexed by the flat cell index (see base.map.Map) holding the
+        index of the next cell on the cycle, or -1 for the walls.
+
+    """
+    if num_rows % 2 != 0:
+        raise ValueError("num_rows must be even.")
+    last_row, last_col = num_rows - 2, num_cols - 2
+    succ = [-1] * (num_rows * num_cols)
+
+    def link(x, y, nxt_x, nxt_y):
+        succ[x * num_cols + y] = nxt_x * num_cols + nxt_y
+
+    for y in range(1, last_col):
+        link(1, y, 1, y + 1)
+    link(1, last_col, 2, last_col)
+    for x in range(2, last_row + 1):
+        if x % 2 == 0:
+            for y in range(last_col, 2, -1):
+                link(x, y, x, y - 1)
+            if x == last_row:
+                link(x, 2, x, 1)
+            else:
+                link(x, 2, x + 1, 2)
+        else:
+            for y in range(2, last_col):
+                link(x, y, x, y + 1)
+            link(x, last_col, x + 1, last_col)
+    for x in range(last_row, 1, -1):
+        link(x, 1, x - 1, 1)
+    return succ
+
+
+def tree_cycle(num_rows, num_cols, seed=None):
+    """Build a hamiltonian cycle around a spanning tree of 2x2 blocks.
+
+    The inside of the map is split into 2x2 blocks, and the cycle walks
+    clockwise around a spanning tree of the blocks: every cell leaves its block
+    through a tree edge on its side, or moves on to the next cell of the block
+    otherwise.
+
+    Args:
+        num_rows (int): Number of rows of the map, walls included. Must be even.
+        num_cols (int): Number of columns of the map, walls included. Must be even.
+        seed (int): Seed of a random spanning tree. If None, the tree joins every
+            row of blocks and links the rows along the first column.
+
+    Returns:
+        A list of the next cells like zigzag_cycle().
+
+    """
+    if num_rows % 2 != 0 or num_cols % 2 != 0:
+        raise ValueError("num_rows and num_cols must be even.")
+    block_rows, block_cols = (num_rows - 2) // 2, (num_cols - 2) // 2
+
+    # Tree edges to the block on the right and to the block below
+    right = [[False] * block_cols for _ in range(block_rows)]
+    down = [[False] * block_cols for _ in range(block_rows)]
+    if seed is None:
+        for i in range(block_rows):
+            for j in range(block_cols - 1):
+                right[i][j] = True
+            if i < block_rows - 1:
+                down[i][0] = True
+    else:
+        rng = random.Random(seed)
+        visited = [[False] * block_cols for _ in range(block_rows)]
+        visited[0][0] = True
+        stack = [(0, 0)]
+        while stack:
+            i, j = stack[-1]
+            adjs = [
+                (ni, nj)
+                for ni, nj in ((i - 1, j), (i + 1, j), (i, j - 1), (i, j + 1))
+                if 0 <= ni < block_rows and 0 <= nj < block_cols and not visited[ni][nj]
+            ]
+            if not adjs:
+                stack.pop()
+                continue
+            ni, nj = rng.choice(adjs)
+            if ni == i:
+                right[i][min(j, nj)] = True
+            else:
+                down[min(i, ni)][j] = True
+            visited[ni][nj] = True
+            stack.append((ni, nj))
+
+    succ = [-1] * (num_rows * num_cols)
+    for i in range(block_rows):
+        for j in range(block_cols):
+            tl = (1 + 2 * i) * num_cols + 1 + 2 * j
+            tr, bl = tl + 1, tl + num_cols
+            br = bl + 1
+            succ[tl] = tl - num_cols if i > 0 and down[i - 1][j] else tr
+            succ[tr] = tr + 1 if right[i][j] else br
+            succ[br] = br + num_cols if down[i][j] else bl
+            succ[bl] = bl - 1 if j > 0 and right[i][j - 1] else tl
+    return succ
+
+
+def is_cycle(succ, num_rows, num_cols):
+    """Check if the next cells form one hamiltonian cycle over the inside of a map."""
+    capacity = (num_rows - 2) * (num_cols - 2)
+    start = cur = num_cols + 1
+    seen = set()
+    for _ in range(capacity):
+        nxt = succ[cur]
+        x, y = divmod(nxt, num_cols)
+        if nxt in seen or abs(nxt - cur) not in (1, num_cols):
+            return False
+        if x < 1 or x > num_rows - 2 or y < 1 or y > num_cols - 2:
+            return False
+        seen.add(nxt)
+        cur = nxt
+    return cur == start
+
+
+def reverse_cycle(succ):
+    """Return the next cells of the same cycle walked the other way."""
+    pred = [-1] * len(succ)
+    for cell, nxt in enumerate(succ):
+        if nxt >= 0:
+            pred[nxt] = cell
+    return pred
+
+
+def build_cycle(kind, num_rows, num_cols, bodies, max_trees=64):
+    """Build a hamiltonian cycle the snake's bodies lie on.
+
+    Mirrored, transposed and reversed versions of the cycle (and other spanning
+    trees for "tree") are tried until one has the bodies as a contiguous
+    segment, walked from the tail to the head.
+
+    Args:
+        kind (str): "zigzag" or "tree".
+        num_rows (int): Number of rows of the map, walls included.
+        num_cols (int): Number of columns of the map, walls included.
+        bodies (list of int): Cell indices of the snake's bodies, from head to tail.
+        max_trees (int): Number of random spanning trees "tree" tries after the default one.
+
+    Returns:
+        A list of the next cells like zigzag_cycle(), or None if no tried cycle fits.
+
+    """
+    if kind == "zigzag":
+        builders = [lambda rows, cols: zigzag_cycle(rows, cols)]
+    elif kind == "tree":
+        builders = [
+            lambda rows, cols, seed=seed: tree_cycle(rows, cols, seed) for seed in [None] + list(range(max_trees))
+        ]
+    else:
+        raise ValueError(f"unknown cycle kind '{kind}'")
+
+    for builder in builders:
+        for transpose in (False, True):
+            base_cols = num_rows if transpose else num_cols
+            base = builder(num_cols, num_rows) if transpose else builder(num_rows, num_cols)
+            for flip_x, flip_y in itertools.product((False, True), repeat=2):
+                # Check the bodies in the coordinates of the base cycle before mapping all of it
+                transform = _Transform(base_cols, num_rows, num_cols, transpose, flip_x, flip_y)
+                base_bodies = [transform.to_base(cell) for cell in bodies]
+                if _fits(base, base_bodies):
+                    return _map_cycle(base, transform)
+                if _fits(base, base_bodies[::-1]):
+                    return reverse_cycle(_map_cycle(base, transform))
+    return None
+
+
+class _Transform:
+    """Transposition and mirroring between the cells of a base cycle and of the map."""
+
+    def __init__(self, base_cols, num_rows, num_cols, transpose, flip_x, flip_y):
+        self._base_cols = base_cols
+        self._num_rows = num_rows
+        self._num_cols = num_cols
+        self._transpose = transpose
+        self._flip_x = flip_x
+        self._flip_y = flip_y
+
+    def to_map(self, cell):
+        x, y = divmod(cell, self._base_cols)
+        if self._transpose:
+            x, y = y, x
+        if self._flip_x:
+            x = self._num_rows - 1 - x
+        if self._flip_y:
+            y = self._num_cols - 1 - y
+        return x * self._num_cols + y
+
+    def to_base(self, cell):
+        x, y = divmod(cell, self._num_cols)
+        if self._flip_x:
+            x = self._num_rows - 1 - x
+        if self._flip_y:
+            y = self._num_cols - 1 - y
+        if self._transpose:
+            x, y = y, x
+        return x * self._base_cols + y
+
+
+def _map_cycle(base, transform):
+    succ = [-1] * len(base)
+    for cell, nxt in enumerate(base):
+        if nxt >= 0:
+            succ[transform.to_map(cell)] = transform.to_map(nxt)
+    return succ
+
+
+def _fits(succ, bodies):
+    return all(succ[bodies[i + 1]] == bodies[i] for i in range(len(bodies) - 1))
@@ -10,7 +10,7 @@ except ImportError:
     print("| WARNING: Tensorflow 1.x is not installed. DQN testing will not be available. |")
     print("*------------------------------------------------------------------------------*")
 
-from snake.base import Direc, PointType, Pos
+from snake.base import Direc, PointType
 from snake.solver.base import BaseSolver
 from snake.solver.dqn.history import History
 from snake.solver.dqn.logger import log
@@ -19,6 +19,14 @@ from snake.solver.dqn.snakeaction import SnakeAction
 
 _DIR_LOG = "logs"
 
+# Number of counter-clockwise quarter turns that make each direction point up
+_ROT90_TIMES = {
+    Direc.LEFT: 3,
+    Direc.UP: 0,
+    Direc.RIGHT: 1,
+    Direc.DOWN: 2,
+}
+
 
 class DQNSolver(BaseSolver):
     PATH_VAR = os.path.join(_DIR_LOG, "solver-var-%d.json")
@@ -434,42 +442,20 @@ class DQNSolver(BaseSolver):
         """Return a vector indicating current state."""
 
         # Visual state
+        grid = self.map.grid
+        if self._use_relative:
+            # Rotate the map so that the snake always heads up
+            grid = np.rot90(grid, _ROT90_TIMES[self.snake.direc])
+        grid = grid[1:-1, 1:-1]
+
         visual_state = np.zeros(self._shape_visual_state, dtype=np.int32)
-        for i in range(1, self.map.num_rows - 1):
-            for j in range(1, self.map.num_cols - 1):
-                pos = Pos(i, j)
-                if self._use_relative:
-                    if self.snake.direc == Direc.LEFT:
-                        pos = Pos(self.map.num_rows - 1 - j, i)
-                    elif self.snake.direc == Direc.UP:
-                        pos = Pos(i, j)
-                    elif self.snake.direc == Direc.RIGHT:
-                        pos = Pos(j, self.map.num_cols - 1 - i)
-                    elif self.snake.direc == Direc.DOWN:
-                        pos = Pos(self.map.num_rows - 1 - i, self.map.num_cols - 1 - j)
-
-                t = self.map.point(pos).type
-                if t == PointType.EMPTY:
-                    visual_state[i - 1][j - 1][0] = 1
-                elif t == PointType.FOOD:
-                    visual_state[i - 1][j - 1][1] = 1
-                elif t in (
-                    PointType.HEAD_L,
-                    PointType.HEAD_U,
-                    PointType.HEAD_R,
-                    PointType.HEAD_D,
-                ):
-                    visual_state[i - 1][j - 1][2] = 1
-                elif t in (
-                    PointType.BODY_LU,
-                    PointType.BODY_UR,
-                    PointType.BODY_RD,
-                    PointType.BODY_DL,
-                    PointType.BODY_HOR,
-                    PointType.BODY_VER,
-                ):
-                    visual_state[i - 1][j - 1][3] = 1
-                raise ValueError(f"Unsupported PointType: {t}")
+        visual_state[:, :, 0] = grid == PointType.EMPTY.value
+        visual_state[:, :, 1] = grid == PointType.FOOD.value
+        visual_state[:, :, 2] = (grid >= PointType.HEAD_L.value) & (grid <= PointType.HEAD_D.value)
+        visual_state[:, :, 3] = (grid >= PointType.BODY_LU.value) & (grid <= PointType.BODY_VER.value)
+        unsupported = ~visual_state.any(axis=2)
+        if unsupported.any():
+            raise ValueError(f"Unsupported PointType: {PointType(grid[unsupported][0])}")
 
         if self._use_visual_only:
             return visual_state.flatten()
@@ -0,0 +1,185 @@
+from collections import deque
+import heapq
+import sys
+
+from snake.base import Direc
+
+_INF = sys.maxsize
+_DIRECS = (Direc.LEFT, Direc.UP, Direc.RIGHT, Direc.DOWN)
+
+
+class FoodField:
+    """Distances from the food to every safe position, maintained across moves.
+
+    Between two food spawns a move only blocks the new head and frees the old
+    tail, so sync() updates the distances around these two cells instead of
+    running a new search. A full rebuild happens only when the food changes or
+    the snake did something other than a single move since the last sync.
+    """
+
+    def __init__(self, snake):
+        self._snake = snake
+        self._map = snake.map
+        self._adjs = [(direc, self._map.offsets[direc.value]) for direc in _DIRECS]
+        self._dist = [_INF] * (self._map.num_rows * self._map.num_cols)
+        self._food = None
+        self._steps = -1
+        self._len = 0
+        self._tail = None
+
+    @property
+    def snake(self):
+        return self._snake
+
+    def dist(self, pos):
+        """Return the distance from a position to the food, or -1 if unreachable."""
+        d = self._dist[self._map.cell(pos)]
+        return -1 if d == _INF else d
+
+    def dist_cell(self, cell):
+        """Return the distance from a cell index to the food, or -1 if unreachable."""
+        d = self._dist[cell]
+        return -1 if d == _INF else d
+
+    def sync(self):
+        """Bring the distances up to date with the snake and the map."""
+        snake, food = self._snake, self._map.food_cell
+        if food is None:
+            self._food = None
+            return
+        if food != self._food or snake.steps != self._steps + 1 or snake.len() != self._len:
+            self._rebuild(food)
+        else:
+            self._unblock(self._tail)
+            self._block(snake.head_cell())
+        self._steps = snake.steps
+        self._len = snake.len()
+        self._tail = snake.tail_cell()
+
+    def path_from_head(self):
+        """Return a shortest path from the snake's head to the food.
+
+        Returns:
+            A collections.deque of snake.base.direc.Direc, empty if the food is unreachable.
+        """
+        self.sync()
+        path = deque()
+        if self._food is None:
+            return path
+        cur, direc = self._snake.head_cell(), self._snake.direc
+        best = self._best_adj(cur, direc, _INF)
+        while best is not None:
+            direc, cur = best
+            path.append(direc)
+            if cur == self._food:
+                break
+            best = self._best_adj(cur, direc, self._dist[cur])
+        return path
+
+    def first_step(self):
+        """Return the first step of path_from_head() without building the rest of the path.
+
+        Returns:
+            A tuple of the snake.base.direc.Direc to move in and the length of the
+            whole path, or None if the food is unreachable.
+        """
+        self.sync()
+        if self._food is None:
+            return None
+        best = self._best_adj(self._snake.head_cell(), self._snake.direc, _INF)
+        if best is None:
+            return None
+        return best[0], self._dist[best[1]] + 1
+
+    def _best_adj(self, cur, direc, bound):
+        """Return the (direc, cell) of the nearest neighbor closer than bound, going straight on ties."""
+        dist, best, best_dist = self._dist, None, bound
+        for adj_direc, offset in self._adjs:
+            nxt = cur + offset
+            if dist[nxt] < best_dist or (dist[nxt] == best_dist < bound and adj_direc == direc):
+                best, best_dist = (adj_direc, nxt), dist[nxt]
+        return best
+
+    def _passable(self, cell):
+        return self._map.is_safe_cell(cell)
+
+    def _rebuild(self, food):
+        self._food = food
+        dist = self._dist
+        dist[:] = [_INF] * len(dist)
+        dist[food] = 0
+        queue = deque([food])
+        while queue:
+            cur = queue.popleft()
+            nxt_dist = dist[cur] + 1
+            for _, offset in self._adjs:
+                nxt = cur + offset
+                if dist[nxt] == _INF and self._passable(nxt):
+                    dist[nxt] = nxt_dist
+                    queue.append(nxt)
+
+    def _unblock(self, cell):
+        """Lower the distances around a cell that has become passable."""
+        if not self._passable(cell):
+            return
+        dist = self._dist
+        dist[cell] = min(dist[cell + offset] for _, offset in self._adjs)
+        if dist[cell] == _INF:
+            return
+        dist[cell] += 1
+        queue = deque([cell])
+        while queue:
+            cur = queue.popleft()
+            nxt_dist = dist[cur] + 1
+            for _, offset in self._adjs:
+                nxt = cur + offset
+                if dist[nxt] > nxt_dist and self._passable(nxt):
+                    dist[nxt] = nxt_dist
+                    queue.append(nxt)
+
+    def _block(self, cell):
+        """Raise the distances of the cells whose shortest paths ran through a blocked cell."""
+        dist = self._dist
+        if dist[cell] == _INF or cell == self._food:
+            return
+
+        # Collect the cells that lost every neighbor one step closer to the food.
+        # Visiting them layer by layer settles each layer before the next is checked.
+        affected = {cell}
+        queue = deque([cell])
+        while queue:
+            cur = queue.popleft()
+            for _, offset in self._adjs:
+                nxt = cur + offset
+                if nxt in affected or dist[nxt] != dist[cur] + 1:
+                    continue
+                supported = False
+                for _, nxt_offset in self._adjs:
+                    sup = nxt + nxt_offset
+                    if sup not in affected and dist[sup] == dist[nxt] - 1:
+                        supported = True
+                        break
+                if not supported:
+                    affected.add(nxt)
+                    queue.append(nxt)
+
+        for cur in affected:
+            dist[cur] = _INF
+
+        # Settle them again from the unaffected cells around, nearest first
+        heap = []
+        for cur in affected:
+            if cur == cell:
+                continue
+            best = min(dist[cur + offset] for _, offset in self._adjs)
+            if best != _INF:
+                heapq.heappush(heap, (best + 1, cur))
+        while heap:
+            cur_dist, cur = heapq.heappop(heap)
+            if cur_dist >= dist[cur]:
+                continue
+            dist[cur] = cur_dist
+            for _, offset in self._adjs:
+                nxt = cur + offset
+                if nxt in affected and nxt != cell and dist[nxt] > cur_dist + 1:
+                    heapq.heappush(heap, (cur_dist + 1, nxt))
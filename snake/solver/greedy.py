@@ -1,36 +1,61 @@
 from snake.base.pos import Pos
+from snake.base.virtual import VirtualSnake
 from snake.solver.base import BaseSolver
 from snake.solver.path import PathSolver
 
 
 class GreedySolver(BaseSolver):
-    def __init__(self, snake):
+    """Go for the food when the snake can still reach its tail after eating it.
+
+    A path to the food that passed the check stays safe as long as the snake
+    follows it and the food does not change, since the snake and the food are
+    all that change on the map. The rest of such a path is kept as a plan, and
+    later steps take it without searching again until the snake deviates from
+    it or the food is eaten.
+
+    With timed, a food that no static path reaches is also tried through the
+    bodies that move away in time (see PathSolver.astar_path_to()). This is
+    off by default: such paths reach the food just in time and often leave
+    the snake in a state the tail check accepts but cannot survive, so fewer
+    games fill the map.
+    """
+
+    def __init__(self, snake, timed=False):
         super().__init__(snake)
+        self._timed = timed
         self._path_solver = PathSolver(snake)
+        self._virtual_solver = PathSolver(snake)  # Runs on virtual snakes
+        self._plan = None  # Verified path to the food, head and steps expected before it, and the food
 
     def next_direc(self):
-        # Create a virtual snake
-        s_copy, m_copy = self.snake.copy()
+        direc = self._follow_plan()
+        if direc is not None:
+            return direc
 
-        # Step 1
+        # Step 1: One traversal answers both the food (step 1) and tail (step 4) queries
         self._path_solver.snake = self.snake
-        path_to_food = self._path_solver.shortest_path_to_food()
+        field = self._path_solver.distance_field()
+        path_to_food = field.path_to(self.map.food)
+        if not path_to_food and self._timed:
+            # The food may still be reached through bodies that move away in time
+            path_to_food = self._path_solver.astar_path_to(self.map.food, timed=True)
 
         if path_to_food:
-            # Step 2
-            s_copy.move_path(path_to_food)
-            if m_copy.is_full():
-                return path_to_food[0]
-
-            # Step 3
-            self._path_solver.snake = s_copy
-            path_to_tail = self._path_solver.longest_path_to_tail()
-            if len(path_to_tail) > 1:
-                return path_to_food[0]
+            # Step 2: Move a virtual copy of the snake along the path
+            virtual = VirtualSnake(self.snake)
+            virtual.move_path(path_to_food)
+            if virtual.map.is_full():
+                verified = True
+            else:
+                # Step 3
+                self._virtual_solver.snake = virtual
+                verified = len(self._virtual_solver.longest_path_to_tail()) > 1
+            if verified:
+                self._plan = (path_to_food, self.snake.head_cell(), self.snake.steps, self.map.food_cell)
+                return self._follow_plan()
 
         # Step 4
-        self._path_solver.snake = self.snake
-        path_to_tail = self._path_solver.longest_path_to_tail()
+        path_to_tail = self._path_solver.longest_path_to_tail(field.path_to(self.snake.tail()))
         if len(path_to_tail) > 1:
             return path_to_tail[0]
 
@@ -44,3 +69,15 @@ class GreedySolver(BaseSolver):
                     max_dist = dist
                     direc = head.direc_to(adj)
         return direc
+
+    def _follow_plan(self):
+        """Return the next direction of the plan, or None if the plan no longer holds."""
+        if self._plan is None:
+            return None
+        path, head, steps, food = self._plan
+        if not path or self.snake.steps != steps or self.snake.head_cell() != head or self.map.food_cell != food:
+            self._plan = None
+            return None
+        direc = path.popleft()
+        self._plan = (path, self.map.adj_cell(head, direc), steps + 1, food)
+        return direc
@@ -1,78 +1,335 @@
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+
 from snake.base import Direc
 from snake.solver.base import BaseSolver
+from snake.solver.cycle import KINDS, build_cycle
+from snake.solver.field import FoodField
 from snake.solver.path import PathSolver
 
+_DIREC_OF_CODE = tuple(Direc)  # Indexed by Direc.value
+
 
 class _TableCell:
-    def __init__(self):
-        self.reset()
+    """Read-only view of the cycle at one cell in HamiltonSolver's flat tables."""
+
+    def __init__(self, solver, cell):
+        self._solver = solver
+        self._cell = cell
 
     def __str__(self):
         return f"{{ idx: {self.idx}  direc: {self.direc} }}"
 
     __repr__ = __str__
 
-    def reset(self):
-        self.idx = None
-        self.direc = Direc.NONE
+    @property
+    def idx(self):
+        idx = int(self._solver._idx[self._cell])
+        return None if idx < 0 else idx
+
+    @property
+    def direc(self):
+        return _DIREC_OF_CODE[self._solver._direc[self._cell]]
 
 
 class HamiltonSolver(BaseSolver):
-    def __init__(self, snake, shortcuts=True):
+    """Follow a hamiltonian cycle on the map, taking shortcuts to the food.
+
+    The cycle is stored in flat arrays indexed by cell (see base.map.Map): the
+    index of every cell on the cycle, counted from the snake's head (-1 on
+    the walls), and the Direc.value of the step to the next cell. It is built
+    with one of these methods:
+
+    - "path": extend the longest path from the head to the tail, which works
+      for any initial snake.
+    - "zigzag" or "tree": construct the cycle directly in linear time (see
+      solver.cycle), falling back to "path" if no constructed cycle contains
+      the initial snake.
+
+    If a cache directory is given, the two arrays are saved there as one .npy
+    file keyed by the map size, the method and the initial snake, and later
+    solvers for the same setup load the file instead of building the cycle
+    again. The file is memory-mapped only while it is read: the tables are
+    converted to lists once, since indexing a memmap on every step is slower
+    than indexing a list.
+
+    Shortcuts normally stop when the snake fills half of the map. In perturbed
+    mode the solver instead keeps the snake's bodies a contiguous segment of
+    the cycle and reroutes the cycle for every shortcut: the positions skipped
+    between the head and the shortcut are spliced back in between two adjacent
+    positions beyond the food. Following the rerouted cycle is as safe as
+    following the original one, so shortcuts can be taken at any length. The
+    original cycle is kept, and restored when the snake is reset or no longer
+    lies on the rerouted cycle. It is built again if the snake does not lie
+    on the original cycle either, e.g. after a random reset. Only a cycle
+    through every position can be rerouted, and the "path" method does not
+    always find one, so the solver just follows an incomplete cycle.
+    """
+
+    def __init__(self, snake, shortcuts=True, cycle="path", cache_dir=None, perturbed=False):
         if snake.map.num_rows % 2 != 0 or snake.map.num_cols % 2 != 0:
             raise ValueError("num_rows and num_cols must be even.")
+        if cycle != "path" and cycle not in KINDS:
+            raise ValueError(f"unknown cycle kind '{cycle}'")
         super().__init__(snake)
 
         self._shortcuts = shortcuts
+        self._cycle = cycle
+        self._perturbed = perturbed
         self._path_solver = PathSolver(snake)
-        self._table = [[_TableCell() for _ in range(snake.map.num_cols)] for _ in range(snake.map.num_rows)]
-        self._build_cycle()
+        self._food_field = FoodField(snake)
+        self._table = None
+        # Offsets to the neighbors off the cycle, indexed by Direc.value of the step on the cycle
+        offsets, num_cols = snake.map.offsets, snake.map.num_cols
+        self._side_offsets = [[offsets[d.value] for d in Direc if d not in (Direc.NONE, direc)] for direc in Direc]
+        # Lookups for rerouting the cycle in perturbed mode
+        self._offset_direc = {offsets[d.value]: d.value for d in Direc if d != Direc.NONE}
+        self._adj_diffs = set(offsets[1:])
+        self._side_offsets_of_diff = {1: (-num_cols, num_cols), num_cols: (-1, 1)}
+        self._side_offsets_of_diff[-1] = self._side_offsets_of_diff[1]
+        self._side_offsets_of_diff[-num_cols] = self._side_offsets_of_diff[num_cols]
+        self._cache_dir = cache_dir
+        self._init_cycle()
+        # Steps and head cell the next call expects if the snake followed the rerouted cycle
+        self._expected = None
 
     @property
     def table(self):
+        if self._table is None:
+            num_rows, num_cols = self.map.num_rows, self.map.num_cols
+            self._table = [[_TableCell(self, i * num_cols + j) for j in range(num_cols)] for i in range(num_rows)]
         return self._table
 
     def next_direc(self):
-        head = self.snake.head()
-        nxt_direc = self._table[head.x][head.y].direc
+        head = self.snake.head_cell()
+        if self._perturbed and self._expected != (self.snake.steps, head):
+            self._check_cycle()
+        nxt_direc = _DIREC_OF_CODE[self._direc[head]]
+
+        food = self.map.food_cell
+        if self._perturbed:
+            if self._shortcuts and self._complete and food is not None and self._detour(head, food):
+                nxt_direc = _DIREC_OF_CODE[self._direc[head]]
+            self._expected = (self.snake.steps + 1, head + self.map.offsets[nxt_direc.value])
+            return nxt_direc
 
         # Take shorcuts when the snake is not too long
-        if self._shortcuts and self.snake.len() < 0.5 * self.map.capacity:
-            path = self._path_solver.shortest_path_to_food()
-            if path:
-                tail, nxt, food = self.snake.tail(), head.adj(path[0]), self.map.food
-                tail_idx = self._table[tail.x][tail.y].idx
-                head_idx = self._table[head.x][head.y].idx
-                nxt_idx = self._table[nxt.x][nxt.y].idx
-                food_idx = self._table[food.x][food.y].idx
-                # Exclude one exception
-                if not (len(path) == 1 and abs(food_idx - tail_idx) == 1):
-                    head_idx_rel = self._relative_dist(tail_idx, head_idx, self.map.capacity)
-                    nxt_idx_rel = self._relative_dist(tail_idx, nxt_idx, self.map.capacity)
-                    food_idx_rel = self._relative_dist(tail_idx, food_idx, self.map.capacity)
-                    if nxt_idx_rel > head_idx_rel and nxt_idx_rel <= food_idx_rel:
-                        nxt_direc = path[0]
+        if self._shortcuts and food is not None and self.snake.len() < 0.5 * self.map.capacity:
+            # Positions relative to the tail along the cycle
+            capacity, idx = self.map.capacity, self._idx
+            tail_idx = idx[self.snake.tail_cell()]
+            head_rel = (idx[head] - tail_idx) % capacity
+            food_rel = (idx[food] - tail_idx) % capacity
+            # Moving to the next position on the cycle is no shortcut, so only look
+            # for a path to the food if another neighbor jumps ahead without passing it
+            leapfrogs = False
+            for offset in self._side_offsets[self._direc[head]]:
+                nxt = head + offset
+                if head_rel < (idx[nxt] - tail_idx) % capacity <= food_rel and self.map.is_safe_cell(nxt):
+                    leapfrogs = True
+                    break
+            if leapfrogs:
+                step = self._food_field.first_step()
+                if step is not None:
+                    direc, path_len = step
+                    nxt_rel = (idx[head + self.map.offsets[direc.value]] - tail_idx) % capacity
+                    # Exclude one exception
+                    if not (path_len == 1 and abs(idx[food] - tail_idx) == 1):
+                        if nxt_rel > head_rel and nxt_rel <= food_rel:
+                            nxt_direc = direc
 
         return nxt_direc
 
+    def _detour(self, head, food):
+        """Reroute the cycle so that the head moves to a neighbor closer to the food.
+
+        Only neighbors beyond the head's next position and not beyond the food
+        qualify, nearest to the food first. The snake's bodies stay a contiguous
+        segment of the cycle, from the tail to the head.
+
+        Returns:
+            Whether the cycle was rerouted.
+        """
+        capacity, idx = self.map.capacity, self._idx
+        tail = self.snake.tail_cell()
+        tail_idx = idx[tail]
+        head_rel = (idx[head] - tail_idx) % capacity
+        food_rel = (idx[food] - tail_idx) % capacity
+        # Neighbors beyond the next position on the cycle that do not pass the food
+        cands = []
+        for offset in self._side_offsets[self._direc[head]]:
+            nxt = head + offset
+            nxt_rel = (idx[nxt] - tail_idx) % capacity
+            if head_rel + 1 < nxt_rel <= food_rel and self.map.is_safe_cell(nxt):
+                cands.append((nxt_rel, nxt))
+        if not cands:
+            return False
+        field = self._food_field
+        field.sync()
+        cands.sort(key=lambda cand: (field.dist_cell(cand[1]), -cand[0]))
+        for _, nxt in cands:
+            if field.dist_cell(nxt) >= 0 and self._splice(head, nxt, food, tail):
+                return True
+        return False
+
+    def _splice(self, head, nxt, food, tail):
+        """Make nxt the head's next position on the cycle.
+
+        The positions first..last skipped between the head and nxt have to be
+        put back beyond the food. If the head, first, last and nxt form a 2x2
+        square, the skipped positions are closed into a cycle of their own,
+        which is merged with the rest through another square: an edge a -> b of
+        the small cycle next to an opposite edge c -> d beyond the food becomes
+        a -> d and c -> b. Otherwise the skipped positions are inserted as a
+        whole, in their order or reversed, between two positions u -> v beyond
+        the food that are adjacent to their ends.
+
+        Returns:
+            Whether the cycle was rerouted.
+        """
+        capacity, idx, succ = self.map.capacity, self._idx, self._succ
+        first, last = succ[head], head
+        while succ[last] != nxt:
+            last = succ[last]
+
+        if first - head == last - nxt:
+            tail_idx = idx[tail]
+            food_rel = (idx[food] - tail_idx) % capacity
+            a = first
+            while True:
+                b = first if a == last else succ[a]
+                for side in self._side_offsets_of_diff[b - a]:
+                    c, d = b + side, a + side
+                    if succ[c] == d and c != tail and (idx[c] - tail_idx) % capacity >= food_rel:
+                        succ[last] = first
+                        succ[a], succ[c] = d, b
+                        succ[head] = nxt
+                        self._renumber(head)
+                        return True
+                if a == last:
+                    break
+                a = succ[a]
+
+        adjs = self._adj_diffs
+        u = food
+        for _ in range(capacity):
+            if u == tail:
+                return False
+            v = succ[u]
+            if u - first in adjs and last - v in adjs:
+                succ[u], succ[last] = first, v
+                break
+            if u - last in adjs and first - v in adjs:
+                cur, prev = first, v
+                while cur != nxt:
+                    cur_succ = succ[cur]
+                    succ[cur] = prev
+                    prev, cur = cur, cur_succ
+                succ[u] = last
+                break
+            u = v
+        else:
+            return False
+        succ[head] = nxt
+        self._renumber(head)
+        return True
+
+    def _check_cycle(self):
+        """Restore the original cycle if the snake was reset or does not lie on the rerouted one."""
+        if self.snake.steps != 0 and self._on_cycle():
+            return
+        self._idx, self._direc = list(self._pristine[0]), list(self._pristine[1])
+        if not self._on_cycle():
+            self._init_cycle()
+        self._link_cycle()
+
+    def _on_cycle(self):
+        """Return whether the snake's bodies are a contiguous segment of the cycle, from the tail to the head."""
+        capacity, idx, bodies = self.map.capacity, self._idx, self.snake.body_cells
+        head_idx = idx[bodies[0]]
+        return all(idx[cell] >= 0 and (head_idx - idx[cell]) % capacity == i for i, cell in enumerate(bodies))
+
+    def _init_cycle(self):
+        """Build or load the cycle for the current snake."""
+        if self._cache_dir is None:
+            self._build_cycle()
+        else:
+            self._load_cycle(self._cache_dir)
+        if self._perturbed:
+            # The cycle is rerouted in place, so keep the original to restore it
+            self._pristine = (list(self._idx), list(self._direc))
+            self._complete = self._idx.count(-1) == len(self._idx) - self.map.capacity
+            self._link_cycle()
+
+    def _link_cycle(self):
+        """Set the successor of every cell on the cycle from the direction table."""
+        offsets = self.map.offsets
+        self._succ = [
+            cell + offsets[code] if idx >= 0 else -1 for cell, (idx, code) in enumerate(zip(self._idx, self._direc))
+        ]
+
+    def _renumber(self, head):
+        """Renumber the cycle from the head after rerouting it."""
+        idx, succ, offset_direc, cur = self._idx, self._succ, self._offset_direc, head
+        for cnt in range(self.map.capacity):
+            idx[cur] = cnt
+            self._direc[cur] = offset_direc[succ[cur] - cur]
+            cur = succ[cur]
+
     def _build_cycle(self):
         """Build a hamiltonian cycle on the map."""
+        num_cells = self.map.num_rows * self.map.num_cols
+        self._idx = [-1] * num_cells
+        self._direc = [Direc.NONE.value] * num_cells
+        if self._cycle != "path":
+            succ = build_cycle(self._cycle, self.map.num_rows, self.map.num_cols, list(self.snake.body_cells))
+            if succ is not None:
+                offset_direc = {self.map.offsets[direc.value]: direc for direc in Direc if direc != Direc.NONE}
+                cur = self.snake.head_cell()
+                for cnt in range(self.map.capacity):
+                    self._idx[cur] = cnt
+                    self._direc[cur] = offset_direc[succ[cur] - cur].value
+                    cur = succ[cur]
+                return
+
         path = self._path_solver.longest_path_to_tail()
-        cur, cnt = self.snake.head(), 0
+        cur, cnt = self.snake.head_cell(), 0
         for direc in path:
-            self._table[cur.x][cur.y].idx = cnt
-            self._table[cur.x][cur.y].direc = direc
-            cur = cur.adj(direc)
+            self._idx[cur] = cnt
+            self._direc[cur] = direc.value
+            cur = self.map.adj_cell(cur, direc)
             cnt += 1
         # Process snake bodies
-        cur = self.snake.tail()
+        cur = self.snake.tail_cell()
         for _ in range(self.snake.len() - 1):
-            self._table[cur.x][cur.y].idx = cnt
-            self._table[cur.x][cur.y].direc = self.snake.direc
-            cur = cur.adj(self.snake.direc)
+            self._idx[cur] = cnt
+            self._direc[cur] = self.snake.direc.value
+            cur = self.map.adj_cell(cur, self.snake.direc)
             cnt += 1
 
-    def _relative_dist(self, ori, x, size):
-        if ori > x:
-            x += size
-        return x - ori
+    def _load_cycle(self, cache_dir):
+        """Load the cycle from the cache, building and saving it first if missing."""
+        path = os.path.join(cache_dir, self._cache_name())
+        if not os.path.exists(path):
+            self._build_cycle()
+            os.makedirs(cache_dir, exist_ok=True)
+            # Write to a temporary file and rename it, so concurrent readers never see a partial file
+            fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    np.save(f, np.array([self._idx, self._direc], dtype=np.int32))
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+        table = np.load(path, mmap_mode="r")
+        self._idx, self._direc = table[0].tolist(), table[1].tolist()
+
+    def _cache_name(self):
+        key = hashlib.sha1()
+        key.update(bytes([self.snake.direc.value]))
+        key.update(np.array(self.snake.body_cells, dtype=np.int64).tobytes())
+        return f"hamilton-{self.map.num_rows}x{self.map.num_cols}-{self._cycle}-{key.hexdigest()[:16]}.npy"
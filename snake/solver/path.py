@@ -1,163 +1,508 @@
 from collections import deque
+import heapq
 import random
 import sys
+import time
+
+import numpy as np
 
 from snake.base import Direc, PointType
 from snake.solver.base import BaseSolver
 
+_DIRECS = (Direc.LEFT, Direc.UP, Direc.RIGHT, Direc.DOWN)
+
 
 class _TableCell:
-    def __init__(self):
-        self.reset()
+    """Read-only view of the search state of one cell in PathSolver's flat tables."""
+
+    def __init__(self, solver, cell):
+        self._solver = solver
+        self._cell = cell
 
     def __str__(self):
         return f"{{ dist: {self.dist}  parent: {str(self.parent)}  visit: {self.visit} }}"
 
     __repr__ = __str__
 
-    def reset(self):
-        # Shortest path
-        self.parent = None
-        self.dist = sys.maxsize
-        # Longest path
-        self.visit = False
+    @property
+    def parent(self):
+        if self._solver._dist_gen[self._cell] != self._solver._gen:
+            return None
+        return self._solver._parent[self._cell]
+
+    @property
+    def dist(self):
+        if self._solver._dist_gen[self._cell] != self._solver._gen:
+            return sys.maxsize
+        return self._solver._dist[self._cell]
+
+    @property
+    def visit(self):
+        return self._solver._visit_gen[self._cell] == self._solver._gen
+
+
+class DistanceField:
+    """Shortest distances from a source to every position reachable from it.
+
+    Built by PathSolver.distance_field(). The field is a snapshot: it is not
+    updated when the map changes afterwards.
+    """
+
+    def __init__(self, game_map, src, cells, dists, parents, area, offset_direc):
+        self._map = game_map
+        self._src = src
+        self._cells = cells
+        self._dist_of = dict(zip(cells, dists))
+        self._parent_of = dict(zip(cells, parents))
+        self._area = area
+        self._offset_direc = offset_direc
+
+    @property
+    def src(self):
+        return self._map.pos(self._src)
+
+    @property
+    def dist(self):
+        """(num_rows, num_cols) array of the distances, -1 where unreachable."""
+        dist = np.full(self._map.num_rows * self._map.num_cols, -1, dtype=np.int64)
+        dist[self._cells] = [self._dist_of[c] for c in self._cells]
+        return dist.reshape(self._map.num_rows, self._map.num_cols)
+
+    @property
+    def parent(self):
+        """(num_rows, num_cols) array of the parents' cell indices, -1 at the source and where unreachable."""
+        parent = np.full(self._map.num_rows * self._map.num_cols, -1, dtype=np.int64)
+        parent[self._cells] = [-1 if c == self._src else self._parent_of[c] for c in self._cells]
+        return parent.reshape(self._map.num_rows, self._map.num_cols)
+
+    @property
+    def area(self):
+        """Number of safe positions reachable from the source, the source excluded."""
+        return self._area
+
+    def dist_to(self, des):
+        """Return the distance to a position, or -1 if it is unreachable."""
+        return self._dist_of.get(self._map.cell(des), -1)
+
+    def path_to(self, des):
+        """Return a collections.deque of snake.base.direc.Direc leading from the source to a position.
+
+        The deque is empty if the position is unreachable or is the source.
+        """
+        path = deque()
+        tmp = self._map.cell(des)
+        if tmp not in self._parent_of:
+            return path
+        parent = self._parent_of[tmp]
+        while parent is not None:
+            path.appendleft(self._offset_direc[tmp - parent])
+            tmp, parent = parent, self._parent_of[parent]
+        return path
 
 
 class PathSolver(BaseSolver):
+    """Path searches on the map.
+
+    The searches run on flat cell indices (see base.map.Map) and only the
+    destinations and returned directions are expressed with Pos and Direc.
+
+    The search state lives in flat preallocated lists. Instead of clearing them
+    before every query, each query takes a new generation number, and an entry
+    only counts if it was stamped with the current generation.
+
+    Timed searches also let paths enter the snake's own bodies once they have
+    moved away: the body at index i (the head being 0) is vacated after
+    len - i moves, so it can be entered from move len - i + 1 on. The step at
+    which each body cell becomes free is kept in another stamped table.
+
+    Besides the breadth-first searches, shortest paths to a single destination
+    can be found with A* guided by the manhattan distance, which expands far
+    fewer cells when the way to the destination is mostly open.
+    """
+
     def __init__(self, snake):
         super().__init__(snake)
-        self._table = [[_TableCell() for _ in range(snake.map.num_cols)] for _ in range(snake.map.num_rows)]
+        num_cells = snake.map.num_rows * snake.map.num_cols
+        self._gen = 0
+        self._parent = [0] * num_cells
+        self._dist = [0] * num_cells
+        self._dist_gen = [0] * num_cells  # Generation that set dist and parent
+        self._visit_gen = [0] * num_cells  # Generation that visited the cell
+        self._free_at = [0] * num_cells  # Move from which a body cell can be entered
+        self._free_gen = [0] * num_cells  # Generation that set free_at
+        self._next = [0] * num_cells  # Next cell on the path being extended, valid on visited cells
+        self._table = None
+        self._adjs = [(direc, snake.map.offsets[direc.value]) for direc in _DIRECS]
+        self._offset_direc = {offset: direc for direc, offset in self._adjs}
+        # Adjacent cells with the one straight ahead first, keyed by the direction of the last step
+        self._straight_adjs = {Direc.NONE: self._adjs}
+        for direc, offset in self._adjs:
+            self._straight_adjs[direc] = [(direc, offset)] + [adj for adj in self._adjs if adj[0] != direc]
+        # Perpendicular directions a step in each direction can be widened to
+        self._side_adjs = {
+            direc: [adj for adj in self._adjs if Direc.opposite(adj[0]) != direc and adj[0] != direc]
+            for direc, _ in self._adjs
+        }
+        self._xs = [cell // snake.map.num_cols for cell in range(num_cells)]
+        self._ys = [cell % snake.map.num_cols for cell in range(num_cells)]
 
     @property
     def table(self):
+        if self._table is None:
+            num_rows, num_cols = self.map.num_rows, self.map.num_cols
+            self._table = [[_TableCell(self, i * num_cols + j) for j in range(num_cols)] for i in range(num_rows)]
         return self._table
 
     def shortest_path_to_food(self):
         return self.path_to(self.map.food, "shortest")
 
-    def longest_path_to_tail(self):
-        return self.path_to(self.snake.tail(), "longest")
+    def longest_path_to_tail(self, path=None, budget=None):
+        return self.path_to(self.snake.tail(), "longest", path, budget)
 
-    def path_to(self, des, path_type):
-        ori_type = self.map.point(des).type
-        self.map.point(des).type = PointType.EMPTY
+    def path_to(self, des, path_type, path=None, budget=None):
+        """Find a path to the destination, which is treated as empty during the search.
+
+        Args:
+            des (snake.base.pos.Pos): The destination position on the map.
+            path_type (str): "shortest", "astar" or "longest".
+            path (collections.deque): A known shortest path to the destination for
+                "longest" to start from, e.g. taken from a distance_field().
+            budget (float): Seconds "longest" may spend searching for a longer
+                path, see longest_path_to().
+        """
+        des = self.map.cell(des)
+        ori_type = self.map.cell_type(des)
+        self.map.set_cell_type(des, PointType.EMPTY)
         if path_type == "shortest":
-            path = self.shortest_path_to(des)
+            path = self._shortest_path_to(des)
+        elif path_type == "astar":
+            path = self._astar_path_to(des)
         elif path_type == "longest":
-            path = self.longest_path_to(des)
-        self.map.point(des).type = ori_type  # Restore origin type
+            path = self._longest_path_to(des, path, budget)
+        self.map.set_cell_type(des, ori_type)  # Restore origin type
         return path
 
-    def shortest_path_to(self, des):
+    def shortest_path_to(self, des, timed=False):
         """Find the shortest path from the snake's head to the destination.
 
         Args:
             des (snake.base.pos.Pos): The destination position on the map.
+            timed (bool): Whether the path may enter the snake's bodies after
+                they have been vacated.
+
+        Returns:
+            A collections.deque of snake.base.direc.Direc indicating the path directions.
+        """
+        return self._shortest_path_to(self.map.cell(des), timed)
+
+    def _shortest_path_to(self, des, timed=False):
+        head = self.snake.head_cell()
+        if self._bfs(head, self.snake.direc, des, timed=timed):
+            return self._build_path(head, des)
+        return deque()
+
+    def astar_path_to(self, des, timed=False):
+        """Find the shortest path from the snake's head to the destination with A*.
+
+        The path has the same length as the one of shortest_path_to(), and ties
+        are broken towards going straight, but without any randomness.
+
+        Args:
+            des (snake.base.pos.Pos): The destination position on the map.
+            timed (bool): Whether the path may enter the snake's bodies after
+                they have been vacated.
 
         Returns:
             A collections.deque of snake.base.direc.Direc indicating the path directions.
         """
-        self._reset_table()
+        return self._astar_path_to(self.map.cell(des), timed)
 
-        head = self.snake.head()
-        self._table[head.x][head.y].dist = 0
+    def _astar_path_to(self, des, timed=False):
+        head = self.snake.head_cell()
+        if self._astar(head, self.snake.direc, des, timed):
+            return self._build_path(head, des)
+        return deque()
+
+    def distance_field(self, src=None, timed=False):
+        """Compute the shortest distances from a source to the whole map in one pass.
+
+        Every safe position reachable from the source gets its distance and its
+        parent on a shortest path. Blocked positions inside the map (e.g. the
+        snake's tail) that border the reachable area get the distance of
+        stepping into them, so they can be used as destinations as well.
+
+        Args:
+            src (snake.base.pos.Pos): The source position, the snake's head by default.
+            timed (bool): Whether paths may enter the snake's bodies after they
+                have been vacated. Only supported from the snake's head.
+
+        Returns:
+            A DistanceField answering path and distance queries in O(path length).
+        """
+        if src is None:
+            src, first_direc = self.snake.head_cell(), self.snake.direc
+        elif timed:
+            raise ValueError("timed search must start from the snake's head")
+        else:
+            src, first_direc = self.map.cell(src), Direc.NONE
+        order = []
+        self._bfs(src, first_direc, None, order, timed)
+        area = len(order) - 1
+
+        # Blocked neighbors of the reached positions, nearest first
+        parents, dists, dist_gen, gen = self._parent, self._dist, self._dist_gen, self._gen
+        for cur in order[:]:
+            for _, offset in self._adjs:
+                nxt = cur + offset
+                if dist_gen[nxt] != gen and self.map.is_inside_cell(nxt):
+                    parents[nxt] = cur
+                    dists[nxt] = dists[cur] + 1
+                    dist_gen[nxt] = gen
+                    order.append(nxt)
+
+        return DistanceField(
+            self.map,
+            src,
+            order,
+            [dists[c] for c in order],
+            [parents[c] for c in order],
+            area,
+            self._offset_direc,
+        )
+
+    def _bfs(self, src, first_direc, des, order=None, timed=False):
+        """Breadth-first search from src, filling the table, until des is reached.
+
+        Args:
+            src (int): Cell index to start from.
+            first_direc (snake.base.direc.Direc): Direction preferred at src.
+            des (int): Cell index to stop at, or None to traverse everything reachable.
+            order (list): If given, the reached cells are appended in visiting order.
+            timed (bool): Whether the snake's bodies can be entered once vacated.
+
+        Returns:
+            Whether des was reached.
+        """
+        gen = self._reset_table()
+        parents, dists, dist_gen = self._parent, self._dist, self._dist_gen
+        if timed:
+            free_at, free_gen = self._free_at, self._free_gen
+            self._stamp_free_at(gen)
+
+        parents[src] = None
+        dists[src] = 0
+        dist_gen[src] = gen
         queue = deque()
-        queue.append(head)
+        queue.append(src)
 
         while queue:
             cur = queue.popleft()
+            if order is not None:
+                order.append(cur)
             if cur == des:
-                return self._build_path(head, des)
+                return True
 
             # Arrange the order of traverse to make the path as straight as possible
-            if cur == head:
-                first_direc = self.snake.direc
-            else:
-                first_direc = self._table[cur.x][cur.y].parent.direc_to(cur)
-            adjs = cur.all_adj()
+            if cur != src:
+                first_direc = self._offset_direc[cur - parents[cur]]
+            adjs = self._adjs.copy()
             random.shuffle(adjs)
-            for i, pos in enumerate(adjs):
-                if first_direc == cur.direc_to(pos):
+            for i, (direc, _) in enumerate(adjs):
+                if first_direc == direc:
                     adjs[0], adjs[i] = adjs[i], adjs[0]
                     break
 
             # Traverse adjacent positions
-            for pos in adjs:
-                if self._is_valid(pos):
-                    adj_cell = self._table[pos.x][pos.y]
-                    if adj_cell.dist == sys.maxsize:
-                        adj_cell.parent = cur
-                        adj_cell.dist = self._table[cur.x][cur.y].dist + 1
-                        queue.append(pos)
+            cur_dist = dists[cur] + 1
+            for _, offset in adjs:
+                nxt = cur + offset
+                if dist_gen[nxt] != gen and (
+                    self._is_valid(nxt) or (timed and free_gen[nxt] == gen and free_at[nxt] <= cur_dist)
+                ):
+                    parents[nxt] = cur
+                    dists[nxt] = cur_dist
+                    dist_gen[nxt] = gen
+                    queue.append(nxt)
+
+        return False
+
+    def _astar(self, src, first_direc, des, timed=False):
+        """A* search from src to des, filling the table.
+
+        Cells are expanded in the order of their distance from src plus their
+        manhattan distance to des. Among equal estimates the deeper cell goes
+        first, and then the one pushed first, which is the straight step.
+        Expanded cells are marked as visited in the table.
 
-        return deque()
-
-    def longest_path_to(self, des):
+        Returns:
+            Whether des was reached.
+        """
+        gen = self._reset_table()
+        parents, dists, dist_gen, visit_gen = self._parent, self._dist, self._dist_gen, self._visit_gen
+        is_safe_cell, xs, ys = self.map.is_safe_cell, self._xs, self._ys
+        if timed:
+            free_at, free_gen = self._free_at, self._free_gen
+            self._stamp_free_at(gen)
+        des_x, des_y = xs[des], ys[des]
+
+        parents[src] = None
+        dists[src] = 0
+        dist_gen[src] = gen
+        heap = [(abs(xs[src] - des_x) + abs(ys[src] - des_y), 0, 0, src)]
+        cnt = 0
+
+        while heap:
+            cur = heapq.heappop(heap)[3]
+            if visit_gen[cur] == gen:
+                continue
+            visit_gen[cur] = gen
+            if cur == des:
+                return True
+
+            direc = first_direc if cur == src else self._offset_direc[cur - parents[cur]]
+            cur_dist = dists[cur] + 1
+            for _, offset in self._straight_adjs[direc]:
+                nxt = cur + offset
+                if visit_gen[nxt] == gen or (dist_gen[nxt] == gen and dists[nxt] <= cur_dist):
+                    continue
+                if is_safe_cell(nxt) or (timed and free_gen[nxt] == gen and free_at[nxt] <= cur_dist):
+                    parents[nxt] = cur
+                    dists[nxt] = cur_dist
+                    dist_gen[nxt] = gen
+                    cnt += 1
+                    est = cur_dist + abs(xs[nxt] - des_x) + abs(ys[nxt] - des_y)
+                    heapq.heappush(heap, (est, -cur_dist, cnt, nxt))
+
+        return False
+
+    def longest_path_to(self, des, budget=None):
         """Find the longest path from the snake's head to the destination.
 
         Args:
             des (snake.base.pos.Pos): The destination position on the map.
+            budget (float): Seconds to spend on a depth-first search for a path
+                longer than the extended shortest path, or None to skip it.
 
         Returns:
             A collections.deque of snake.base.direc.Direc indicating the path directions.
         """
-        path = self.shortest_path_to(des)
+        return self._longest_path_to(self.map.cell(des), budget=budget)
+
+    def _longest_path_to(self, des, path=None, budget=None):
+        path = self._shortest_path_to(des) if path is None else path
         if not path:
             return deque()
 
-        self._reset_table()
-        cur = head = self.snake.head()
+        gen = self._reset_table()
+        visit_gen, nxt_of = self._visit_gen, self._next
+        cur = head = self.snake.head_cell()
+        offsets = self.map.offsets
 
-        # Set all positions on the shortest path to 'visited'
-        self._table[cur.x][cur.y].visit = True
+        # Link the positions on the shortest path and set them to 'visited'
+        visit_gen[cur] = gen
         for direc in path:
-            cur = cur.adj(direc)
-            self._table[cur.x][cur.y].visit = True
-
-        # Extend the path between each pair of the positions
-        idx, cur = 0, head
-        while True:
-            cur_direc = path[idx]
-            nxt = cur.adj(cur_direc)
-
-            if cur_direc == Direc.LEFT or cur_direc == Direc.RIGHT:
-                tests = [Direc.UP, Direc.DOWN]
-            elif cur_direc == Direc.UP or cur_direc == Direc.DOWN:
-                tests = [Direc.LEFT, Direc.RIGHT]
-
-            extended = False
-            for test_direc in tests:
-                cur_test = cur.adj(test_direc)
-                nxt_test = nxt.adj(test_direc)
+            nxt = cur + offsets[direc.value]
+            nxt_of[cur] = nxt
+            visit_gen[nxt] = gen
+            cur = nxt
+
+        # Extend the path between each pair of the positions by splicing a detour
+        # cur -> cur_test -> nxt_test -> nxt into the links, which is O(1)
+        cur = head
+        while cur != des:
+            nxt = nxt_of[cur]
+            for _, test_offset in self._side_adjs[self._offset_direc[nxt - cur]]:
+                cur_test = cur + test_offset
+                nxt_test = nxt + test_offset
                 if self._is_valid(cur_test) and self._is_valid(nxt_test):
-                    self._table[cur_test.x][cur_test.y].visit = True
-                    self._table[nxt_test.x][nxt_test.y].visit = True
-                    path.insert(idx, test_direc)
-                    path.insert(idx + 2, Direc.opposite(test_direc))
-                    extended = True
+                    visit_gen[cur_test] = gen
+                    visit_gen[nxt_test] = gen
+                    nxt_of[cur] = cur_test
+                    nxt_of[cur_test] = nxt_test
+                    nxt_of[nxt_test] = nxt
                     break
-
-            if not extended:
+            else:
                 cur = nxt
-                idx += 1
-                if idx >= len(path):
-                    break
 
+        path, cur = deque(), head
+        while cur != des:
+            nxt = nxt_of[cur]
+            path.append(self._offset_direc[nxt - cur])
+            cur = nxt
+
+        if budget is not None:
+            path = self._refine_longest(des, path, budget)
         return path
 
+    def _refine_longest(self, des, path, budget):
+        """Search depth-first for a path to des longer than the given one within a time budget.
+
+        The search stops early once a path covers every position reachable from
+        the head. Otherwise the longest path found before the deadline is returned.
+        """
+        deadline = time.perf_counter() + budget
+        is_safe_cell = self.map.is_safe_cell
+        head = self.snake.head_cell()
+        on_path = bytearray(len(self._next))
+
+        # No path can be longer than the number of reachable positions
+        bound = self.map.bitboard().area(head)
+        if len(path) >= bound:
+            return path
+
+        best, direcs = list(path), []
+        cells, adjs = [head], [iter(self._straight_adjs[self.snake.direc])]
+        on_path[head] = 1
+        num_nodes = 0
+        while adjs:
+            num_nodes += 1
+            if num_nodes % 1024 == 0 and time.perf_counter() > deadline:
+                break
+            cur = cells[-1]
+            for direc, offset in adjs[-1]:
+                nxt = cur + offset
+                if on_path[nxt] or not is_safe_cell(nxt):
+                    continue
+                if nxt == des:
+                    if len(direcs) + 1 > len(best):
+                        best = direcs + [direc]
+                    continue
+                on_path[nxt] = 1
+                cells.append(nxt)
+                adjs.append(iter(self._straight_adjs[direc]))
+                direcs.append(direc)
+                break
+            else:
+                on_path[cells.pop()] = 0
+                adjs.pop()
+                if direcs:
+                    direcs.pop()
+            if len(best) >= bound:
+                break
+        return deque(best)
+
+    def _stamp_free_at(self, gen):
+        """Record the move from which each body cell can be entered."""
+        free_at, free_gen = self._free_at, self._free_gen
+        bodies = self.snake.body_cells
+        num_bodies = len(bodies)
+        for i, cell in enumerate(bodies):
+            free_at[cell] = num_bodies - i + 1
+            free_gen[cell] = gen
+
     def _reset_table(self):
-        for row in self._table:
-            for col in row:
-                col.reset()
+        """Invalidate the whole table in O(1) and return the new generation."""
+        self._gen += 1
+        return self._gen
 
     def _build_path(self, src, des):
         path = deque()
         tmp = des
         while tmp != src:
-            parent = self._table[tmp.x][tmp.y].parent
-            path.appendleft(parent.direc_to(tmp))
+            parent = self._parent[tmp]
+            path.appendleft(self._offset_direc[tmp - parent])
             tmp = parent
         return path
 
-    def _is_valid(self, pos):
-        return self.map.is_safe(pos) and not self._table[pos.x][pos.y].visit
+    def _is_valid(self, cell):
+        return self.map.is_safe_cell(cell) and self._visit_gen[cell] != self._gen
@@ -0,0 +1,83 @@
+class Histogram:
+    """Histogram of non-negative integers with HDR-style log-linear buckets.
+
+    Values below 2 ** sub_bits each get their own bucket. Above that, every
+    power-of-two range is split into 2 ** (sub_bits - 1) equal buckets, so a
+    bucket never spans more than 1 / 2 ** (sub_bits - 1) of the values in it
+    whatever their magnitude. Recording is a bit_length() and a shift, and
+    the memory use only depends on the largest value recorded.
+    """
+
+    def __init__(self, sub_bits=7):
+        """Initialize a Histogram object.
+
+        Args:
+            sub_bits (int): Number of significant bits kept of every value.
+                The default of 7 keeps percentiles within 1.6%.
+
+        """
+        self._sub_bits = sub_bits
+        self._half = 1 << (sub_bits - 1)
+        self._counts = [0] * (1 << sub_bits)
+        self._count = 0
+        self._max = 0
+
+    @property
+    def count(self):
+        return self._count
+
+    @property
+    def max(self):
+        return self._max
+
+    def record(self, value):
+        shift = value.bit_length() - self._sub_bits
+        if shift <= 0:
+            idx = value
+        else:
+            idx = shift * self._half + (value >> shift)
+            if idx >= len(self._counts):
+                self._counts.extend([0] * (idx + 1 - len(self._counts)))
+        self._counts[idx] += 1
+        self._count += 1
+        if value > self._max:
+            self._max = value
+
+    def percentile(self, p):
+        """Return the value below which p percent of the recorded values lie, or 0 if there are none.
+
+        Values are resolved to the highest value of their bucket, but never
+        above the largest value recorded.
+        """
+        if not self._count:
+            return 0
+        rank = max(1, -(-self._count * p // 100))  # Ceiling without floats
+        seen = 0
+        for idx, num in enumerate(self._counts):
+            seen += num
+            if seen >= rank:
+                return min(self._highest(idx), self._max)
+        return self._max
+
+    def merge(self, other):
+        """Add the values recorded by another histogram with the same sub_bits."""
+        if other._sub_bits != self._sub_bits:
+            raise ValueError("histograms must have the same sub_bits")
+        if len(other._counts) > len(self._counts):
+            self._counts.extend([0] * (len(other._counts) - len(self._counts)))
+        for idx, num in enumerate(other._counts):
+            self._counts[idx] += num
+        self._count += other._count
+        self._max = max(self._max, other._max)
+
+    def reset(self):
+        self._counts = [0] * (1 << self._sub_bits)
+        self._count = 0
+        self._max = 0
+
+    def _highest(self, idx):
+        """Return the highest value that falls in a bucket."""
+        if idx < (1 << self._sub_bits):
+            return idx
+        shift = idx // self._half - 1
+        return ((idx - shift * self._half + 1) << shift) - 1
@@ -0,0 +1,146 @@
+from collections import Counter
+import cProfile
+import os
+import signal
+import time
+
+from snake.util.histogram import Histogram
+
+# Percentiles PhaseTimer.stats() reports
+PERCENTILES = (50, 95, 99)
+
+
+class PhaseTimer:
+    """Histograms of the time spent in the successive phases of a loop.
+
+    start() marks the beginning of an iteration, and every lap(phase) adds the
+    nanoseconds elapsed since the previous mark to the histogram of the phase.
+    The time lap() takes to record them is left out of every phase.
+    """
+
+    def __init__(self, name=""):
+        self._name = name
+        self._hists = {}
+        self._last = 0
+
+    @property
+    def name(self):
+        return self._name
+
+    @property
+    def phases(self):
+        """Names of the phases recorded so far, in the order they first occurred."""
+        return list(self._hists)
+
+    def histogram(self, phase):
+        return self._hists[phase]
+
+    def start(self):
+        self._last = time.perf_counter_ns()
+
+    def lap(self, phase):
+        now = time.perf_counter_ns()
+        hist = self._hists.get(phase)
+        if hist is None:
+            hist = self._hists[phase] = Histogram()
+        hist.record(now - self._last)
+        self._last = time.perf_counter_ns()
+
+    def merge(self, other):
+        """Add the timings recorded by another PhaseTimer, e.g. one from a worker process."""
+        for phase, hist in other._hists.items():
+            self._hists.setdefault(phase, Histogram()).merge(hist)
+
+    def stats(self):
+        """Return {phase: {"count", "p50_us", "p95_us", "p99_us", "max_us"}} of every phase."""
+        stats = {}
+        for phase, hist in self._hists.items():
+            stats[phase] = {"count": hist.count}
+            for p in PERCENTILES:
+                stats[phase][f"p{p}_us"] = hist.percentile(p) / 1000
+            stats[phase]["max_us"] = hist.max / 1000
+        return stats
+
+    def report(self):
+        """Return the stats() as a text table."""
+        columns = ["count"] + [f"p{p}_us" for p in PERCENTILES] + ["max_us"]
+        lines = [f"[Phase timings: {self._name}]", f"{'phase':<8}" + "".join(f"{col:>12}" for col in columns)]
+        for phase, row in self.stats().items():
+            cells = [f"{row['count']:>12}"] + [f"{row[col]:>12.1f}" for col in columns[1:]]
+            lines.append(f"{phase:<8}" + "".join(cells))
+        return "\n".join(lines)
+
+
+class StackSampler:
+    """Sampling profiler that counts the call stacks seen at a fixed CPU-time interval.
+
+    The stacks are taken from a SIGPROF handler, so this only works on Unix
+    and in the main thread. write() saves them in the collapsed format
+    ("outer;inner count" per line) read by flamegraph tools.
+    """
+
+    def __init__(self, interval=0.001):
+        self._interval = interval
+        self._stacks = Counter()
+
+    @property
+    def stacks(self):
+        return self._stacks
+
+    def start(self):
+        signal.signal(signal.SIGPROF, self._sample)
+        signal.setitimer(signal.ITIMER_PROF, self._interval, self._interval)
+
+    def stop(self):
+        signal.setitimer(signal.ITIMER_PROF, 0)
+        signal.signal(signal.SIGPROF, signal.SIG_DFL)
+
+    def write(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, num in self._stacks.most_common():
+                f.write(f"{stack} {num}\n")
+
+    def _sample(self, signum, frame):
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+            frame = frame.f_back
+        self._stacks[";".join(reversed(names))] += 1
+
+
+class Profiler:
+    """Context manager that profiles its body with cProfile and/or a StackSampler.
+
+    Nothing is profiled when both paths are None, so the body can be wrapped
+    unconditionally.
+    """
+
+    def __init__(self, pstats_path=None, stacks_path=None, interval=0.001):
+        """Initialize a Profiler object.
+
+        Args:
+            pstats_path (str): Path to dump the cProfile stats to, readable by pstats.
+            stacks_path (str): Path to write the sampled collapsed stacks to.
+            interval (float): Seconds of CPU time between two stack samples.
+
+        """
+        self._pstats_path = pstats_path
+        self._stacks_path = stacks_path
+        self._profile = cProfile.Profile() if pstats_path else None
+        self._sampler = StackSampler(interval) if stacks_path else None
+
+    def __enter__(self):
+        if self._sampler:
+            self._sampler.start()
+        if self._profile:
+            self._profile.enable()
+        return self
+
+    def __exit__(self, *exc):
+        if self._profile:
+            self._profile.disable()
+            self._profile.dump_stats(self._pstats_path)
+        if self._sampler:
+            self._sampler.stop()
+            self._sampler.write(self._stacks_path)
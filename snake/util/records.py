@@ -0,0 +1,57 @@
+import csv
+import json
+import sys
+
+# Formats RecordWriter can write
+FORMATS = ("jsonl", "csv")
+
+
+class RecordWriter:
+    """Write flat dict records as JSON Lines or CSV, to a file or to stdout.
+
+    CSV output has one header row with a fixed list of fields. Records that
+    lack some of them leave the cells empty, so records of different kinds
+    (e.g. per-episode ones and a summary) can share a file.
+    """
+
+    def __init__(self, path, fmt="jsonl", fields=None):
+        """Initialize a RecordWriter object.
+
+        Args:
+            path (str): Path of the output file, or "-" for stdout.
+            fmt (str): "jsonl" or "csv".
+            fields (list of str): Columns of the CSV output, in order. Required for "csv".
+
+        """
+        if fmt not in FORMATS:
+            raise ValueError(f"unknown record format '{fmt}'")
+        if fmt == "csv" and not fields:
+            raise ValueError("'fields' are required for csv records")
+        self._fmt = fmt
+        if path == "-":
+            self._file, self._owns_file = sys.stdout, False
+        else:
+            self._file, self._owns_file = open(path, "w", encoding="utf-8", newline=""), True
+        self._csv = None
+        if fmt == "csv":
+            self._csv = csv.DictWriter(self._file, fieldnames=fields, restval="", extrasaction="ignore")
+            self._csv.writeheader()
+
+    def write(self, record):
+        if self._csv is not None:
+            self._csv.writerow(record)
+        else:
+            self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+
+    def close(self):
+        if self._owns_file:
+            self._file.close()
+        else:
+            self._file.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
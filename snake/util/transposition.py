@@ -0,0 +1,87 @@
+class TranspositionTable:
+    """Bounded cache of search results keyed by state hashes, e.g. Map.zobrist.
+
+    Every key maps to one slot of a fixed-size table (key % capacity), so the
+    memory use never grows and lookups are a single index. When two keys share
+    a slot, the entry from a deeper search is kept, unless it was stored
+    before the last new_search() call, in which case it is replaced anyway.
+    """
+
+    def __init__(self, capacity):
+        if capacity <= 0:
+            raise ValueError("'capacity' must be positive")
+        self._capacity = capacity
+        self._keys = [None] * capacity
+        self._values = [None] * capacity
+        self._depths = [0] * capacity
+        self._ages = [0] * capacity
+        self._age = 0
+        self._size = 0
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def capacity(self):
+        return self._capacity
+
+    @property
+    def hits(self):
+        return self._hits
+
+    @property
+    def misses(self):
+        return self._misses
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, key):
+        return self._keys[key % self._capacity] == key
+
+    def get(self, key, default=None):
+        """Return the value stored for a key, or default if it is not (or no longer) in the table."""
+        slot = key % self._capacity
+        if self._keys[slot] == key:
+            self._hits += 1
+            return self._values[slot]
+        self._misses += 1
+        return default
+
+    def depth(self, key):
+        """Return the search depth stored with a key, or -1 if it is not in the table."""
+        slot = key % self._capacity
+        return self._depths[slot] if self._keys[slot] == key else -1
+
+    def put(self, key, value, depth=0):
+        """Store a value for a key, searched to some depth.
+
+        Returns:
+            True if the value was stored, False if the slot is kept for a
+            deeper entry of the current search.
+
+        """
+        slot = key % self._capacity
+        old_key = self._keys[slot]
+        if old_key is None:
+            self._size += 1
+        elif old_key != key and self._ages[slot] == self._age and self._depths[slot] > depth:
+            return False
+        self._keys[slot] = key
+        self._values[slot] = value
+        self._depths[slot] = depth
+        self._ages[slot] = self._age
+        return True
+
+    def new_search(self):
+        """Mark every stored entry as stale, so that any new entry may replace it."""
+        self._age += 1
+
+    def clear(self):
+        self._keys = [None] * self._capacity
+        self._values = [None] * self._capacity
+        self._depths = [0] * self._capacity
+        self._ages = [0] * self._capacity
+        self._age = 0
+        self._size = 0
+        self._hits = 0
+        self._misses = 0
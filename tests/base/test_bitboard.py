@@ -0,0 +1,72 @@
+from snake.base import Direc, Map, PointType, Pos, Snake
+from snake.base.bitboard import Bitboard, pack, unpack
+
+
+def _cells(game_map, positions):
+    return sum(1 << game_map.cell(pos) for pos in positions)
+
+
+def test_from_map():
+    m = Map(6, 6)
+    s = Snake(m, Direc.RIGHT, [Pos(1, 2), Pos(1, 1)], [PointType.HEAD_R, PointType.BODY_HOR])
+    m.create_food(Pos(3, 3))
+    b = m.bitboard()
+    assert b.bodies == _cells(m, s.bodies)
+    assert b.food == 1 << m.cell(Pos(3, 3))
+    assert b.walls == pack(m.grid == PointType.WALL.value)
+    assert b.free == pack(m.safe_mask())
+    assert b.count(b.free) == m.capacity - s.len()
+    assert list(b.cells(b.bodies)) == sorted(s.body_cells)
+    assert (unpack(b.free, 6, 6) == m.safe_mask()).all()
+
+
+def test_expand_layers():
+    m = Map(7, 7)
+    b = m.bitboard()
+    src = m.cell(Pos(3, 3))
+    assert b.expand(1 << src) == _cells(m, [Pos(2, 3), Pos(4, 3), Pos(3, 2), Pos(3, 4)])
+
+    # Corners of the inside have two free neighbors, the walls around are left out
+    assert b.expand(1 << m.cell(Pos(1, 1))) == _cells(m, [Pos(1, 2), Pos(2, 1)])
+    assert b.expand(1 << m.cell(Pos(1, 5))) == _cells(m, [Pos(1, 4), Pos(2, 5)])
+
+    layers = list(b.layers(1 << src))
+    assert [b.count(layer) for layer in layers] == [1, 4, 8, 8, 4]
+    assert b.reachable(1 << src) == b.free
+    assert b.area(src) == m.capacity - 1
+    assert b.dist(m.cell(Pos(1, 1)), m.cell(Pos(5, 5))) == 8
+
+
+def test_walls_split():
+    m = Map(7, 7)
+    for i in range(1, 6):
+        m.point(Pos(i, 3)).type = PointType.WALL
+    b = m.bitboard()
+    left = m.cell(Pos(1, 1))
+    assert b.area(left) == 9
+    assert b.dist(left, m.cell(Pos(1, 5))) == -1
+    assert b.reachable(1 << left) == _cells(m, [Pos(x, y) for x in range(1, 6) for y in range(1, 3)])
+
+
+def test_dead_ends():
+    m = Map(7, 7)
+    s = Snake(
+        m,
+        Direc.DOWN,
+        [Pos(2, 1), Pos(1, 1), Pos(1, 2), Pos(1, 3), Pos(2, 3), Pos(3, 3)],
+        [
+            PointType.HEAD_D,
+            PointType.BODY_RD,
+            PointType.BODY_HOR,
+            PointType.BODY_DL,
+            PointType.BODY_VER,
+            PointType.BODY_VER,
+        ],
+    )
+    b = m.bitboard()
+    assert b.bodies == _cells(m, s.bodies)
+    expected = 0
+    for cell in Bitboard.cells(b.free):
+        if sum(m.is_safe_cell(m.adj_cell(cell, direc)) for direc in Direc if direc != Direc.NONE) <= 1:
+            expected |= 1 << cell
+    assert b.dead_ends() == expected == _cells(m, [Pos(2, 2)])
@@ -1,6 +1,6 @@
 import pytest
 
-from snake.base import Map, PointType, Pos
+from snake.base import Direc, Map, PointType, Pos
 
 
 def test_init():
@@ -25,6 +25,7 @@ def test_copy():
     assert m.num_rows == m_copy.num_rows
     assert m.num_cols == m_copy.num_cols
     assert m.capacity == m_copy.capacity
+    assert m.zobrist == m_copy.zobrist
     for i in range(m.num_rows):
         for j in range(m.num_cols):
             assert m.point(Pos(i, j)).type == m_copy.point(Pos(i, j)).type
@@ -71,3 +72,87 @@ def test_food():
     for i in range(1, m.num_rows - 1):
         for j in range(1, m.num_cols - 1):
             assert m.point(Pos(i, j)).type == PointType.EMPTY
+
+
+def test_grid():
+    m = Map(6, 7)
+    assert m.grid.shape == (6, 7)
+    assert not m.grid.flags.writeable
+    m.point(Pos(1, 2)).type = PointType.HEAD_R
+    m.point(Pos(1, 1)).type = PointType.BODY_HOR
+    m.create_food(Pos(3, 4))
+    assert m.grid[1, 2] == PointType.HEAD_R.value
+    assert m.grid[3, 4] == PointType.FOOD.value
+    assert m.grid[0, 0] == PointType.WALL.value
+    safe, body = m.safe_mask(), m.body_mask()
+    for i in range(m.num_rows):
+        for j in range(m.num_cols):
+            p = Pos(i, j)
+            assert safe[i, j] == m.is_safe(p)
+            assert body[i, j] == (m.is_inside(p) and m.point(p).type.value >= PointType.HEAD_L.value)
+    m_copy = m.copy()
+    m_copy.point(Pos(3, 4)).type = PointType.EMPTY
+    assert m.grid[3, 4] == PointType.FOOD.value
+    assert m_copy.grid[3, 4] == PointType.EMPTY.value
+
+
+def test_rand_food():
+    m = Map(6, 6)
+    empty = {Pos(i, j) for i in range(1, m.num_rows - 1) for j in range(1, m.num_cols - 1)}
+    for i, pos in enumerate(sorted(empty, key=lambda p: (p.x, p.y))):
+        if i % 3:
+            m.point(pos).type = PointType.BODY_HOR
+            empty.remove(pos)
+    m.point(Pos(2, 2)).type = PointType.EMPTY
+    empty.add(Pos(2, 2))
+    for _ in range(50):
+        food = m.create_rand_food()
+        assert food in empty
+        assert m.create_rand_food() is None  # Food exists
+        m.rm_food()
+    for pos in empty:
+        m.point(pos).type = PointType.HEAD_U
+    assert m.create_rand_food() is None
+
+
+def test_counters():
+    m = Map(6, 6)
+    assert m.num_empty == m.capacity and m.num_food == 0 and m.num_body == 0
+    assert m.remaining_capacity() == m.capacity and m.fill_ratio() == 0
+    m.create_food(Pos(1, 1))
+    m.point(Pos(1, 2)).type = PointType.HEAD_R
+    m.point(Pos(1, 3)).type = PointType.BODY_HOR
+    m.point(Pos(1, 4)).type = PointType.WALL
+    m.point(Pos(0, 1)).type = PointType.BODY_HOR  # Outside, not counted
+    assert m.num_empty == m.capacity - 4 and m.num_food == 1 and m.num_body == 2
+    assert m.remaining_capacity() == m.capacity - 2
+    assert m.fill_ratio() == 2 / m.capacity
+    m.point(Pos(1, 3)).type = PointType.BODY_VER
+    assert m.num_body == 2
+    m.rm_food()
+    m_copy = m.copy()
+    assert m_copy.num_empty == m.num_empty == m.capacity - 3
+    assert m_copy.num_food == m.num_food == 0
+    assert m_copy.num_body == m.num_body == 2
+    m.reset()
+    assert m.num_empty == m.capacity and m.num_body == 0
+
+
+def test_cell():
+    m = Map(6, 7)
+    for i in range(m.num_rows):
+        for j in range(m.num_cols):
+            p = Pos(i, j)
+            c = m.cell(p)
+            assert c == i * m.num_cols + j and m.pos(c) == p
+            assert m.is_inside_cell(c) == m.is_inside(p)
+            assert m.is_safe_cell(c) == m.is_safe(p)
+            assert m.is_empty_cell(c) == m.is_empty(p)
+            if m.is_inside(p):
+                for direc in (Direc.LEFT, Direc.UP, Direc.RIGHT, Direc.DOWN):
+                    assert m.pos(m.adj_cell(c, direc)) == p.adj(direc)
+    c = m.cell(Pos(2, 3))
+    m.set_cell_type(c, PointType.BODY_VER)
+    assert m.cell_type(c) == m.point(Pos(2, 3)).type == PointType.BODY_VER
+    assert m.create_food_cell(m.cell(Pos(3, 3))) == m.food_cell
+    assert m.food == Pos(3, 3)
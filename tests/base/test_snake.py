@@ -1,3 +1,5 @@
+import random
+
 from snake.base import Direc, Map, PointType, Pos, Snake
 
 
@@ -15,6 +17,8 @@ def test_init():
     assert s.head() == Pos(1, 3)
     assert s.bodies[1] == Pos(1, 2)
     assert s.tail() == Pos(1, 1)
+    assert s.head_cell() == m.cell(s.head()) and s.tail_cell() == m.cell(s.tail())
+    assert list(s.body_cells) == [m.cell(pos) for pos in s.bodies]
     assert m.point(Pos(1, 1)).type == PointType.BODY_HOR
     assert m.point(Pos(1, 2)).type == PointType.BODY_HOR
     assert m.point(Pos(1, 3)).type == PointType.HEAD_R
@@ -199,3 +203,68 @@ def test_copy():
     assert s.direc_next == Direc.LEFT and s.direc_next == s_copy.direc_next
     for i, body in enumerate(s.bodies):
         assert body == s_copy.bodies[i]
+
+
+def test_apply_revert():
+    random.seed(0)
+    m = Map(7, 7)
+    s = Snake(
+        m,
+        Direc.RIGHT,
+        [Pos(1, 3), Pos(1, 2), Pos(1, 1)],
+        [PointType.HEAD_R, PointType.BODY_HOR, PointType.BODY_HOR],
+    )
+    direcs = [Direc.LEFT, Direc.UP, Direc.RIGHT, Direc.DOWN, Direc.NONE]
+    for _ in range(50):
+        if not m.has_food():
+            m.create_rand_food()
+        grid, bodies, food, zobrist = m.grid.copy(), list(s.body_cells), m.food_cell, m.zobrist
+        free = list(m._free)
+        state = (s.steps, s.dead, s.direc, s.direc_next, m.num_empty, m.num_food, m.num_body)
+        s_moved, m_moved = s.copy()
+        tokens = []
+        for _ in range(random.randrange(1, 12)):
+            direc = random.choice(direcs)
+            tokens.append(s.apply(direc))
+            s_moved.move(direc)
+        # apply() moves exactly like move(), which keeps no journal
+        assert (m.grid == m_moved.grid).all() and list(s.body_cells) == list(s_moved.body_cells)
+        assert (s.steps, s.dead, s.direc) == (s_moved.steps, s_moved.dead, s_moved.direc)
+        s.revert_path(tokens)
+        assert (m.grid == grid).all() and list(s.body_cells) == bodies and m.food_cell == food
+        assert m.zobrist == zobrist
+        # The empty cells keep their order, so the next random food is the same
+        assert m._free == free
+        assert state == (s.steps, s.dead, s.direc, s.direc_next, m.num_empty, m.num_food, m.num_body)
+        # Advance the real snake by a safe move, if any
+        for direc in direcs[:4]:
+            if direc != Direc.opposite(s.direc) and m.is_safe(s.head().adj(direc)):
+                s.move(direc)
+                break
+
+
+def test_zobrist():
+    m = Map(6, 6)
+    s = Snake(m, Direc.RIGHT, [Pos(1, 2), Pos(1, 1)], [PointType.HEAD_R, PointType.BODY_HOR])
+    initial = m.zobrist
+
+    # Going around a 2x2 square brings back the same state after every lap
+    square = (Direc.DOWN, Direc.LEFT, Direc.UP, Direc.RIGHT)
+    s.move_path(square)
+    start = m.zobrist
+    for direc in square:
+        s.move(direc)
+        assert m.zobrist != initial
+    assert m.zobrist == start
+
+    m.create_food(Pos(4, 4))
+    with_food = m.zobrist
+    assert with_food != start
+    m.rm_food()
+    assert m.zobrist == start
+
+    # Same cells, other direction
+    s2 = Snake(Map(6, 6), Direc.LEFT, [Pos(1, 1), Pos(1, 2)], [PointType.HEAD_L, PointType.BODY_HOR])
+    assert s2.map.zobrist != initial
+    s.reset()
+    assert m.zobrist == initial
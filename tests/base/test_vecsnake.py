@@ -0,0 +1,58 @@
+import numpy as np
+
+from snake.base import Direc, Map, PointType, Snake
+from snake.base.vecsnake import VecSnake
+
+
+def _mirror(vec, env):
+    """Build a Map and Snake with the same state as one game of vec."""
+    m = Map(vec.num_rows, vec.num_cols)
+    cells = vec.bodies(env)
+    types = [PointType(int(vec.grids[env].flat[c])) for c in cells]
+    s = Snake(m, Direc(int(vec.direc[env])), [m.pos(c) for c in cells], types)
+    m.create_food_cell(int(vec.food[env]))
+    return m, s
+
+
+def test_init():
+    vec = VecSnake(3, 6, 7, seed=0)
+    assert vec.grids.shape == (3, 6, 7)
+    assert not vec.grids.flags.writeable
+    assert (vec.lens() == 2).all() and not vec.dead.any() and not vec.is_full().any()
+    assert (vec.food >= 0).all()
+    for env in range(vec.num_envs):
+        head, neck = vec.bodies(env)
+        assert head == vec.heads()[env] and neck == vec.tails()[env]
+        assert vec.grids[env].flat[vec.food[env]] == PointType.FOOD.value
+
+
+def test_step_matches_snake():
+    rng = np.random.default_rng(0)
+    vec = VecSnake(8, 5, 6, seed=1)
+    games = [_mirror(vec, env) for env in range(vec.num_envs)]
+    num_full = 0
+    for _ in range(600):
+        actions = rng.integers(0, 5, vec.num_envs)
+        for env, (m, s) in enumerate(games):
+            # Prefer safe moves so that some snakes grow long
+            safe = [d for d in (1, 2, 3, 4) if d != Direc.opposite(s.direc).value and m.is_safe(s.head().adj(Direc(d)))]
+            if safe and rng.random() < 0.95:
+                actions[env] = rng.choice(safe)
+        ate, died, full = vec.step(actions)
+        for env, (m, s) in enumerate(games):
+            food = m.food_cell
+            s.move(Direc(int(actions[env])))
+            assert ate[env] == (food is not None and m.food_cell is None)
+            if not m.has_food() and vec.food[env] >= 0:
+                m.create_food_cell(int(vec.food[env]))
+            assert (m.grid == vec.grids[env]).all()
+            assert list(s.body_cells) == vec.bodies(env)
+            assert s.dead == vec.dead[env] == died[env]  # Finished games are reset below
+            assert s.steps == vec.steps[env] and s.direc.value == vec.direc[env]
+            assert m.is_full() == full[env]
+        num_full += int(full.sum())
+        done = np.flatnonzero(vec.dead | vec.is_full())
+        vec.reset(done)
+        for env in done:
+            games[env] = _mirror(vec, env)
+    assert num_full > 0
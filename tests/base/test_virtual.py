@@ -0,0 +1,65 @@
+import random
+
+from snake.base import Direc, Map, PointType, Pos, Snake
+from snake.base.virtual import VirtualSnake
+
+
+def _new_snake():
+    m = Map(8, 8)
+    s = Snake(
+        m,
+        Direc.RIGHT,
+        [Pos(1, 4), Pos(1, 3), Pos(1, 2), Pos(1, 1)],
+        [PointType.HEAD_R, PointType.BODY_HOR, PointType.BODY_HOR, PointType.BODY_HOR],
+    )
+    return m, s
+
+
+def test_fork():
+    m, s = _new_snake()
+    m.create_food(Pos(3, 3))
+    v = VirtualSnake(s)
+    assert v.len() == s.len() and v.direc is s.direc and v.steps == s.steps
+    assert v.head() == s.head() and v.tail() == s.tail()
+    assert v.body_cells == list(s.body_cells)
+    assert v.map.food == Pos(3, 3) and v.map.num_body == m.num_body
+    for cell in range(m.num_rows * m.num_cols):
+        assert v.map.is_safe_cell(cell) == m.is_safe_cell(cell)
+
+
+def test_move_path():
+    m, s = _new_snake()
+    m.create_food(Pos(2, 5))
+    path = [Direc.DOWN, Direc.RIGHT, Direc.DOWN, Direc.LEFT]
+    v = VirtualSnake(s)
+    v.move_path(path)
+
+    # The live snake and map are untouched
+    assert s.len() == 4 and s.head() == Pos(1, 4) and m.food == Pos(2, 5)
+
+    for direc in path:
+        s.move(direc)
+    assert not v.map.has_food() and v.map.food_cell is None
+    assert v.len() == s.len() == 5 and v.map.num_body == m.num_body
+    assert v.direc is s.direc and v.steps == s.steps
+    assert v.body_cells == list(s.body_cells)
+    for cell in range(m.num_rows * m.num_cols):
+        assert v.map.is_safe_cell(cell) == m.is_safe_cell(cell)
+
+
+def test_random_moves():
+    random.seed(0)
+    m, s = _new_snake()
+    v = VirtualSnake(s)
+    for _ in range(200):
+        direcs = [d for d in Direc if d != Direc.NONE and m.is_safe_cell(s.head_cell() + m.offsets[d.value])]
+        if not direcs:
+            break
+        direc = random.choice(direcs)
+        s.move(direc)
+        v.move_path([direc])
+        assert v.head_cell() == s.head_cell() and v.tail_cell() == s.tail_cell()
+        assert v.map.is_safe_cell(s.tail_cell()) == m.is_safe_cell(s.tail_cell())
+    assert v.body_cells == list(s.body_cells)
+    for cell in range(m.num_rows * m.num_cols):
+        assert v.map.is_safe_cell(cell) == m.is_safe_cell(cell)
@@ -0,0 +1,41 @@
+from snake.base import Map, Pos
+from snake.solver.cycle import build_cycle, is_cycle, reverse_cycle, tree_cycle, zigzag_cycle
+
+
+def test_zigzag():
+    for num_rows, num_cols in ((6, 6), (6, 9), (8, 12), (14, 6)):
+        succ = zigzag_cycle(num_rows, num_cols)
+        assert is_cycle(succ, num_rows, num_cols)
+        assert is_cycle(reverse_cycle(succ), num_rows, num_cols)
+    m = Map(6, 6)
+    succ = zigzag_cycle(6, 6)
+    assert [m.pos(succ[m.cell(Pos(1, y))]) for y in range(1, 5)] == [Pos(1, 2), Pos(1, 3), Pos(1, 4), Pos(2, 4)]
+    assert m.pos(succ[m.cell(Pos(2, 1))]) == Pos(1, 1)
+
+
+def test_tree():
+    for num_rows, num_cols in ((6, 6), (6, 10), (12, 8)):
+        assert is_cycle(tree_cycle(num_rows, num_cols), num_rows, num_cols)
+        for seed in range(10):
+            assert is_cycle(tree_cycle(num_rows, num_cols, seed), num_rows, num_cols)
+    assert tree_cycle(12, 12, 3) == tree_cycle(12, 12, 3)
+    assert not is_cycle([-1] * 36, 6, 6)
+
+
+def test_build():
+    m = Map(10, 10)
+    for kind in ("zigzag", "tree"):
+        for bodies in (
+            [Pos(1, 4), Pos(1, 3), Pos(1, 2), Pos(1, 1)],
+            [Pos(1, 1), Pos(1, 2), Pos(1, 3)],
+            [Pos(8, 8), Pos(7, 8)],
+            [Pos(5, 3), Pos(5, 4)],
+        ):
+            cells = [m.cell(pos) for pos in bodies]
+            succ = build_cycle(kind, m.num_rows, m.num_cols, cells)
+            assert succ is not None and is_cycle(succ, m.num_rows, m.num_cols)
+            for i in range(len(cells) - 1):
+                assert succ[cells[i + 1]] == cells[i]
+    # A snake coiled against the cycles
+    cells = [m.cell(pos) for pos in (Pos(2, 2), Pos(2, 3), Pos(3, 3), Pos(3, 2))]
+    assert build_cycle("zigzag", m.num_rows, m.num_cols, cells) is None
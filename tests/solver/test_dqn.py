@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from snake.base import Direc, Map, PointType, Pos, Snake
+from snake.solver.base import BaseSolver
+
+pytest.importorskip("matplotlib")  # Imported by the DQN history plots
+from snake.solver.dqn import DQNSolver  # noqa: E402
+
+_CHANNELS = {
+    PointType.EMPTY: 0,
+    PointType.FOOD: 1,
+    PointType.HEAD_L: 2,
+    PointType.HEAD_U: 2,
+    PointType.HEAD_R: 2,
+    PointType.HEAD_D: 2,
+    PointType.BODY_LU: 3,
+    PointType.BODY_UR: 3,
+    PointType.BODY_RD: 3,
+    PointType.BODY_DL: 3,
+    PointType.BODY_HOR: 3,
+    PointType.BODY_VER: 3,
+}
+
+
+def _solver(snake, use_relative, use_visual_only):
+    # _state() needs none of the network, so skip the tensorflow setup
+    solver = DQNSolver.__new__(DQNSolver)
+    BaseSolver.__init__(solver, snake)
+    solver._use_relative = use_relative
+    solver._use_visual_only = use_visual_only
+    solver._shape_visual_state = (snake.map.num_rows - 2, snake.map.num_cols - 2, 4)
+    solver._num_important_features = 0 if use_visual_only else (3 if use_relative else 4)
+    return solver
+
+
+def _visual_state(m, direc, use_relative):
+    """Per-cell encoding of the map, as the state used to be built."""
+    state = np.zeros((m.num_rows - 2, m.num_cols - 2, 4), dtype=np.int32)
+    for i in range(1, m.num_rows - 1):
+        for j in range(1, m.num_cols - 1):
+            pos = Pos(i, j)
+            if use_relative:
+                if direc == Direc.LEFT:
+                    pos = Pos(m.num_rows - 1 - j, i)
+                elif direc == Direc.RIGHT:
+                    pos = Pos(j, m.num_cols - 1 - i)
+                elif direc == Direc.DOWN:
+                    pos = Pos(m.num_rows - 1 - i, m.num_cols - 1 - j)
+            state[i - 1][j - 1][_CHANNELS[m.point(pos).type]] = 1
+    return state
+
+
+@pytest.mark.parametrize("use_relative", [True, False])
+def test_state(use_relative):
+    for direc, head_type in (
+        (Direc.LEFT, PointType.HEAD_L),
+        (Direc.UP, PointType.HEAD_U),
+        (Direc.RIGHT, PointType.HEAD_R),
+        (Direc.DOWN, PointType.HEAD_D),
+    ):
+        m = Map(7, 7)
+        m.create_food(Pos(1, 4))
+        s = Snake(m, direc, [Pos(3, 3), Pos(3, 2), Pos(2, 2)], [head_type, PointType.BODY_DL, PointType.BODY_VER])
+        visual = _visual_state(m, direc, use_relative)
+
+        state = _solver(s, use_relative, True)._state()
+        assert np.array_equal(state, visual.flatten())
+
+        state = _solver(s, use_relative, False)._state()
+        assert np.array_equal(state[: visual.size], visual.flatten())
+        assert len(state) == visual.size + (3 if use_relative else 4)
+
+
+def test_state_unsupported():
+    m = Map(6, 6)
+    m.point(Pos(2, 3)).type = PointType.WALL
+    s = Snake(m, Direc.RIGHT, [Pos(1, 2), Pos(1, 1)], [PointType.HEAD_R, PointType.BODY_HOR])
+    with pytest.raises(ValueError):
+        _solver(s, True, False)._state()
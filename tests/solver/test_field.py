@@ -0,0 +1,45 @@
+import random
+
+from snake.base import Direc, Map, PointType, Pos, Snake
+from snake.solver.field import FoodField
+from snake.solver.path import PathSolver
+
+
+def test_sync():
+    random.seed(0)
+    m = Map(10, 10)
+    s = Snake(
+        m,
+        Direc.RIGHT,
+        [Pos(1, 4), Pos(1, 3), Pos(1, 2), Pos(1, 1)],
+        [PointType.HEAD_R] + [PointType.BODY_HOR] * 3,
+    )
+    field = FoodField(s)
+    path_solver = PathSolver(s)
+    for _ in range(400):
+        if s.dead:
+            s.reset()
+        if not m.has_food():
+            m.create_rand_food()
+        path = field.path_from_head()
+        assert field.first_step() == ((path[0], len(path)) if path else None)
+        # Same distances as a search from scratch
+        expect = path_solver.distance_field(m.food)
+        for i in range(1, m.num_rows - 1):
+            for j in range(1, m.num_cols - 1):
+                pos = Pos(i, j)
+                assert field.dist(pos) == (expect.dist_to(pos) if m.is_safe(pos) else -1)
+        assert len(path) == len(path_solver.shortest_path_to_food())
+        cur = s.head()
+        for direc in path:
+            cur = cur.adj(direc)
+            assert m.is_safe(cur)
+        assert not path or cur == m.food
+        # Mostly follow the path, sometimes wander off
+        direcs = [d for d in (Direc.LEFT, Direc.UP, Direc.RIGHT, Direc.DOWN) if m.is_safe(s.head().adj(d))]
+        if path and random.random() < 0.7:
+            s.move(path[0])
+        elif direcs:
+            s.move(random.choice(direcs))
+        else:
+            s.move(s.direc)
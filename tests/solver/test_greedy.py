@@ -0,0 +1,76 @@
+from snake.base import Direc, Map, PointType, Pos, Snake
+from snake.solver import GreedySolver
+
+
+def test_plan():
+    m = Map(10, 10)
+    m.create_food(Pos(6, 6))
+    s = Snake(m, Direc.RIGHT, [Pos(1, 3), Pos(1, 2), Pos(1, 1)], [PointType.HEAD_R] + [PointType.BODY_HOR] * 2)
+    solver = GreedySolver(s)
+    num_searches = 0
+    distance_field = solver._path_solver.distance_field
+
+    def count_searches():
+        nonlocal num_searches
+        num_searches += 1
+        return distance_field()
+
+    solver._path_solver.distance_field = count_searches
+    s.move(solver.next_direc())
+    assert num_searches == 1
+    # The verified path is followed without searching again
+    for _ in range(3):
+        s.move(solver.next_direc())
+    assert num_searches == 1
+    # A new food invalidates the plan
+    m.rm_food()
+    m.create_food(Pos(8, 1))
+    s.move(solver.next_direc())
+    assert num_searches == 2
+    # So does a deviation from the plan
+    planned = solver._plan[0][0]
+    for direc in (Direc.LEFT, Direc.UP, Direc.RIGHT, Direc.DOWN):
+        if direc not in (planned, Direc.opposite(s.direc)) and m.is_safe(s.head().adj(direc)):
+            s.move(direc)
+            break
+    s.move(solver.next_direc())
+    assert num_searches == 3
+    while m.has_food():
+        s.move(solver.next_direc())
+    assert not s.dead and s.len() == 4
+
+
+def _timed_searches(timed):
+    """Let a GreedySolver take one step and return the timed argument of every A* search it ran."""
+    m = Map(7, 7)
+    m.create_food(Pos(2, 2))
+    # The food is walled in by the snake, which moves out of the way in time
+    s = Snake(
+        m,
+        Direc.DOWN,
+        [Pos(4, 1), Pos(3, 1), Pos(3, 2), Pos(3, 3), Pos(2, 3), Pos(1, 3)],
+        [
+            PointType.HEAD_D,
+            PointType.BODY_RD,
+            PointType.BODY_HOR,
+            PointType.BODY_LU,
+            PointType.BODY_VER,
+            PointType.BODY_VER,
+        ],
+    )
+    solver = GreedySolver(s, timed=timed)
+    searches = []
+    astar_path_to = solver._path_solver.astar_path_to
+
+    def record_search(des, timed=False):
+        searches.append(timed)
+        return astar_path_to(des, timed)
+
+    solver._path_solver.astar_path_to = record_search
+    s.move(solver.next_direc())
+    return searches
+
+
+def test_timed():
+    assert _timed_searches(False) == []
+    assert _timed_searches(True) == [True]
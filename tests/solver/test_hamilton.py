@@ -1,5 +1,8 @@
+import random
+
 from snake.base import Direc, Map, PointType, Pos, Snake
 from snake.solver import HamiltonSolver
+from snake.solver.field import FoodField
 
 
 def test_cycle():
@@ -17,3 +20,132 @@ def test_cycle():
         if s.head() == ori_head:
             break
     assert cnt == m.capacity
+
+
+def test_constructed_cycles():
+    for cycle in ("zigzag", "tree"):
+        m = Map(8, 10)
+        s = Snake(
+            m, Direc.LEFT, [Pos(4, 3), Pos(4, 4), Pos(4, 5)], [PointType.HEAD_L, PointType.BODY_HOR, PointType.BODY_HOR]
+        )
+        solver = HamiltonSolver(s, False, cycle)
+        table = solver.table
+        ori_head = s.head()
+        for cnt in range(m.capacity):
+            head = s.head()
+            assert cnt == table[head.x][head.y].idx
+            assert head.adj(table[head.x][head.y].direc) == s.head().adj(solver.next_direc())
+            s.move(solver.next_direc())
+            assert not s.dead
+        assert s.head() == ori_head
+
+
+def test_cache(tmp_path):
+    def new_solver():
+        m = Map(8, 8)
+        s = Snake(m, Direc.RIGHT, [Pos(1, 2), Pos(1, 1)], [PointType.HEAD_R, PointType.BODY_HOR])
+        return s, HamiltonSolver(s, False, cache_dir=str(tmp_path))
+
+    _, solver = new_solver()
+    files = list(tmp_path.iterdir())
+    assert len(files) == 1 and files[0].suffix == ".npy"
+    s, solver_cached = new_solver()
+    assert list(tmp_path.iterdir()) == files
+    # The loaded tables are plain lists, not views of the file
+    assert type(solver_cached._idx) is list and type(solver_cached._direc) is list
+    for i in range(s.map.num_rows):
+        for j in range(s.map.num_cols):
+            assert solver_cached.table[i][j].idx == solver.table[i][j].idx
+            assert solver_cached.table[i][j].direc == solver.table[i][j].direc
+    for cnt in range(s.map.capacity):
+        head = s.head()
+        assert cnt == solver_cached.table[head.x][head.y].idx
+        s.move(solver_cached.next_direc())
+    assert s.head() == Pos(1, 2)
+
+
+def test_shortcuts():
+    random.seed(0)
+    m = Map(10, 10)
+    s = Snake(m, Direc.RIGHT, [Pos(1, 2), Pos(1, 1)], [PointType.HEAD_R, PointType.BODY_HOR])
+    solver = HamiltonSolver(s)
+    field = FoodField(s)
+    table = solver.table
+    num_shortcuts = 0
+    while s.len() < 0.5 * m.capacity:
+        if not m.has_food():
+            m.create_rand_food()
+        # Take the first step to the food if it moves ahead on the cycle without passing the food
+        head, tail, food = s.head(), s.tail(), m.food
+        expect = table[head.x][head.y].direc
+        path = field.path_from_head()
+        if path:
+            nxt = head.adj(path[0])
+            rel = [(table[p.x][p.y].idx - table[tail.x][tail.y].idx) % m.capacity for p in (head, nxt, food)]
+            if not (len(path) == 1 and abs(table[food.x][food.y].idx - table[tail.x][tail.y].idx) == 1):
+                if rel[0] < rel[1] <= rel[2]:
+                    expect = path[0]
+        direc = solver.next_direc()
+        assert direc == expect
+        num_shortcuts += direc != table[head.x][head.y].direc
+        s.move(direc)
+        assert not s.dead
+    assert num_shortcuts > 0
+
+
+def _assert_on_cycle(s, table):
+    """Assert that the cycle visits every position once, with the bodies contiguous on it from tail to head."""
+    m = s.map
+    head_idx = table[s.head().x][s.head().y].idx
+    cur, cnt = s.head(), 0
+    while True:
+        assert (table[cur.x][cur.y].idx - head_idx) % m.capacity == cnt
+        cur, cnt = cur.adj(table[cur.x][cur.y].direc), cnt + 1
+        if cur == s.head():
+            break
+    assert cnt == m.capacity
+    for i, body in enumerate(s.bodies):
+        assert (head_idx - table[body.x][body.y].idx) % m.capacity == i
+
+
+def test_perturbed(tmp_path):
+    random.seed(0)
+    m = Map(8, 8)
+    s = Snake(m, Direc.RIGHT, [Pos(1, 2), Pos(1, 1)], [PointType.HEAD_R, PointType.BODY_HOR])
+    solver = HamiltonSolver(s, cache_dir=str(tmp_path), perturbed=True)
+    table = solver.table
+    num_steps = 0
+    while not m.is_full():
+        if not m.has_food():
+            m.create_rand_food()
+        s.move(solver.next_direc())
+        num_steps += 1
+        assert not s.dead
+        _assert_on_cycle(s, table)
+    # Far fewer steps than following the whole cycle for every food
+    assert num_steps < m.capacity * m.capacity / 4
+
+
+def test_perturbed_reset():
+    for init_bodies, reset_at in (([Pos(1, 2), Pos(1, 1)], 30), ([Pos(1, 2), Pos(1, 1)], 100), (None, 30)):
+        random.seed(1)
+        m = Map(8, 8)
+        if init_bodies:
+            s = Snake(m, Direc.RIGHT, init_bodies, [PointType.HEAD_R, PointType.BODY_HOR])
+        else:
+            s = Snake(m)  # Placed at random again by the reset
+        solver = HamiltonSolver(s, perturbed=True)
+        table = solver.table
+        for _ in range(reset_at):
+            if not m.has_food():
+                m.create_rand_food()
+            s.move(solver.next_direc())
+        s.reset()
+        # The cycle is restored, or built again for the new snake, before the first step
+        while not m.is_full():
+            if not m.has_food():
+                m.create_rand_food()
+            s.move(solver.next_direc())
+            assert not s.dead
+            _assert_on_cycle(s, table)
+            assert s.steps < m.capacity * m.capacity / 4
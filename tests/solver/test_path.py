@@ -1,3 +1,5 @@
+import sys
+
 from snake.base import Direc, Map, PointType, Pos, Snake
 from snake.solver import PathSolver
 
@@ -58,3 +60,138 @@ def test_longest():
         assert direc == expect_path[i]
     # Empty path
     assert not solver.longest_path_to(s.tail())
+
+
+def test_table_generation():
+    m = Map(7, 7)
+    m.create_food(Pos(5, 5))
+    s = Snake(
+        m, Direc.RIGHT, [Pos(2, 3), Pos(2, 2), Pos(2, 1)], [PointType.HEAD_R, PointType.BODY_HOR, PointType.BODY_HOR]
+    )
+    solver = PathSolver(s)
+    assert solver.longest_path_to_tail()
+    assert any(cell.visit for row in solver.table for cell in row)
+    assert solver.shortest_path_to_food()
+    # A new query invalidates everything the previous ones stamped
+    assert not any(cell.visit for row in solver.table for cell in row)
+    assert solver.table[2][3].dist == 0 and solver.table[2][3].parent is None
+    assert solver.table[5][5].dist == 5 and solver.table[5][5].parent is not None
+    m.point(Pos(4, 5)).type = PointType.WALL
+    m.point(Pos(5, 4)).type = PointType.WALL
+    assert not solver.shortest_path_to(Pos(5, 5))
+    assert solver.table[5][5].dist == sys.maxsize and solver.table[5][5].parent is None
+
+
+def test_distance_field():
+    m = Map(8, 8)
+    m.create_food(Pos(5, 5))
+    s = Snake(
+        m,
+        Direc.RIGHT,
+        [Pos(2, 3), Pos(2, 2), Pos(2, 1)],
+        [PointType.HEAD_R, PointType.BODY_HOR, PointType.BODY_HOR],
+    )
+    for i in range(1, 4):
+        m.point(Pos(i, 5)).type = PointType.WALL
+    m.point(Pos(2, 6)).type = PointType.WALL  # Pos(1, 6) is unreachable
+    solver = PathSolver(s)
+    field = solver.distance_field()
+    assert field.src == s.head()
+    assert field.dist.shape == field.parent.shape == (m.num_rows, m.num_cols)
+    assert field.dist[2, 3] == 0 and field.parent[2, 3] == -1
+    assert field.area == m.num_empty + m.num_food - 1
+    assert field.dist_to(Pos(1, 6)) == -1 and not field.path_to(Pos(1, 6))
+    assert field.dist_to(Pos(0, 3)) == -1  # Walls around the map are never reached
+    for i in range(1, m.num_rows - 1):
+        for j in range(1, m.num_cols - 1):
+            des = Pos(i, j)
+            if not m.is_safe(des) or des == Pos(1, 6):
+                continue
+            path = field.path_to(des)
+            assert len(path) == field.dist_to(des) == field.dist[i, j] == len(solver.shortest_path_to(des))
+            cur = s.head()
+            for direc in path:
+                cur = cur.adj(direc)
+                assert m.is_safe(cur)
+            assert cur == des
+    # Blocked destinations next to the reachable area, e.g. the tail
+    assert field.dist_to(s.tail()) == 4 and len(field.path_to(s.tail())) == 4
+    assert len(solver.longest_path_to_tail(field.path_to(s.tail()))) > 4
+
+
+def test_timed():
+    m = Map(7, 7)
+    m.create_food(Pos(2, 2))
+    # The food is walled in by the snake, which moves out of the way in time
+    s = Snake(
+        m,
+        Direc.DOWN,
+        [Pos(4, 1), Pos(3, 1), Pos(3, 2), Pos(3, 3), Pos(2, 3), Pos(1, 3)],
+        [
+            PointType.HEAD_D,
+            PointType.BODY_RD,
+            PointType.BODY_HOR,
+            PointType.BODY_LU,
+            PointType.BODY_VER,
+            PointType.BODY_VER,
+        ],
+    )
+    solver = PathSolver(s)
+    assert not solver.shortest_path_to_food()
+    assert solver.distance_field().dist_to(m.food) == -1
+    path = solver.shortest_path_to(m.food, timed=True)
+    assert len(path) == 7
+    assert solver.distance_field(timed=True).dist_to(m.food) == 7
+    for direc in path:
+        s.move(direc)
+        assert not s.dead
+    assert s.head() == Pos(2, 2) and s.len() == 7
+
+
+def test_astar():
+    m = Map(32, 32)
+    m.create_food(Pos(25, 28))
+    s = Snake(
+        m, Direc.RIGHT, [Pos(2, 3), Pos(2, 2), Pos(2, 1)], [PointType.HEAD_R, PointType.BODY_HOR, PointType.BODY_HOR]
+    )
+    solver = PathSolver(s)
+    expect_path = solver.shortest_path_to_food()
+    num_reached = sum(cell.dist != sys.maxsize for row in solver.table for cell in row)
+    act_path = solver.path_to(m.food, "astar")
+    assert len(act_path) == len(expect_path) == 48
+    assert act_path[0] == Direc.RIGHT  # Go straight on ties
+    assert act_path == solver.astar_path_to(m.food)  # No randomness
+    num_expanded = sum(cell.visit for row in solver.table for cell in row)
+    assert num_expanded * 10 < num_reached
+    cur = s.head()
+    for direc in act_path:
+        cur = cur.adj(direc)
+        assert m.is_safe(cur)
+    assert cur == m.food
+    # Same paths around obstacles
+    for i in range(1, 30):
+        m.point(Pos(i, 10)).type = PointType.WALL
+    assert len(solver.astar_path_to(m.food)) == len(solver.shortest_path_to_food()) == 58
+    assert not solver.astar_path_to(s.tail())
+
+
+def test_longest_budget():
+    m = Map(7, 7)
+    s = Snake(
+        m, Direc.RIGHT, [Pos(1, 3), Pos(1, 2), Pos(1, 1)], [PointType.HEAD_R, PointType.BODY_HOR, PointType.BODY_HOR]
+    )
+    for pos in (Pos(3, 3), Pos(2, 4), Pos(5, 2)):
+        m.point(pos).type = PointType.WALL
+    solver = PathSolver(s)
+    # Widening the shortest path pairwise gets stuck behind the walls
+    assert len(solver.longest_path_to_tail()) == 8
+    act_path = solver.longest_path_to_tail(budget=1.0)
+    assert len(act_path) == 18
+    assert m.point(s.tail()).type == PointType.BODY_HOR
+    cur = s.head()
+    for direc in list(act_path)[:-1]:
+        cur = cur.adj(direc)
+        assert m.is_safe(cur)
+    assert cur.adj(act_path[-1]) == s.tail()
+    # No time for the search
+    assert len(solver.longest_path_to_tail(budget=0)) >= 8
@@ -0,0 +1,63 @@
+import json
+import sys
+
+from snake.__main__ import main
+from snake.game import Game, GameConf, GameMode
+from snake.util.profiling import PERCENTILES
+
+
+def test_benchmark_latency(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    conf = GameConf()
+    conf.mode = GameMode.BENCHMARK
+    conf.map_rows = conf.map_cols = 6
+    conf.benchmark_episodes = 2
+    conf.benchmark_workers = 1
+    conf.benchmark_seed = 0
+    conf.benchmark_output = str(tmp_path / "bench.jsonl")
+    conf.instrument = True
+    Game(conf).run()
+
+    with open(conf.benchmark_output, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    assert [record["type"] for record in records] == ["episode", "episode", "summary"]
+    fields = {f"latency_p{p}_ms" for p in PERCENTILES} | {"latency_max_ms"}
+    for record in records:
+        assert {key for key in record if key.startswith("latency_")} == fields
+    # The solver latency of the records is the solver phase of the timings
+    summary = records[-1]
+    solver = summary["phases"]["solver"]
+    assert solver["count"] == sum(record["steps"] for record in records[:-1])
+    for p in PERCENTILES:
+        assert summary[f"latency_p{p}_ms"] == solver[f"p{p}_us"] / 1000
+    assert summary["latency_max_ms"] == solver["max_us"] / 1000
+
+
+def test_main(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for solver in ("greedy", "hamilton"):
+        output = str(tmp_path / f"{solver}.jsonl")
+        argv = ["snake", "-s", solver, "-m", "bcmk", "--episodes", "2", "--seed", "0", "--output", output]
+        argv += ["--loop-repeats", "3"]
+        monkeypatch.setattr(sys, "argv", argv)
+        main()
+        with open(output, encoding="utf-8") as f:
+            records = [json.loads(line) for line in f]
+        assert [record["type"] for record in records] == ["episode", "episode", "summary"]
+        assert records[-1]["solver"] == f"{solver.capitalize()}Solver" and records[-1]["episodes"] == 2
+
+
+def test_benchmark_workers(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    outcomes = []
+    for workers in (1, 2):
+        conf = GameConf()
+        conf.mode = GameMode.BENCHMARK
+        conf.benchmark_workers = workers
+        conf.benchmark_seed = 0
+        game = Game(conf, log=False)
+        results = sorted(game._benchmark_results(3), key=lambda r: r.episode)
+        outcomes.append([(r.episode, r.seed, r.status, r.length, r.steps) for r in results])
+        game._on_exit()
+    # Results only depend on the seed and the episode, not on how the episodes are run
+    assert outcomes[0] == outcomes[1]
@@ -0,0 +1,53 @@
+import random
+
+import pytest
+
+from snake.base import Direc, Map, PointType, Pos, Snake
+from snake.replay import ReplayWriter, ascii_frame, read_replay, replay_frames
+from snake.solver.greedy import GreedySolver
+
+
+def _play(writer, episode, num_steps):
+    """Play an episode with GreedySolver, recording it, and return the frames seen along the way."""
+    m = Map(8, 8)
+    s = Snake(m, Direc.RIGHT, [Pos(1, 3), Pos(1, 2), Pos(1, 1)], [PointType.HEAD_R] + [PointType.BODY_HOR] * 2)
+    solver = GreedySolver(s)
+    writer.episode(episode, s)
+    frames = []
+    for _ in range(num_steps):
+        if not m.has_food():
+            m.create_rand_food()
+            writer.food(m.food_cell)
+        if s.dead or m.is_full():
+            break
+        s.direc_next = solver.next_direc()
+        writer.step(s.direc_next)
+        frames.append(ascii_frame(episode, s))
+        s.move()
+    frames.append(ascii_frame(episode, s))
+    return frames
+
+
+def test_replay(tmp_path):
+    random.seed(0)
+    path = str(tmp_path / "game.replay")
+    writer = ReplayWriter(path, 8, 8, buffer_size=16)  # Small buffer to go through the writer thread often
+    frames = _play(writer, 1, 100) + _play(writer, 2, 30)
+    writer.close()
+
+    records = list(read_replay(path))
+    assert records[0] == ("header", (8, 8))
+    assert records[1] == ("episode", (1, Direc.RIGHT, [11, 10, 9], [PointType.HEAD_R] + [PointType.BODY_HOR] * 2))
+    assert sum(kind == "step" for kind, _ in records) == 130
+    assert list(replay_frames(path)) == frames
+
+    # One byte per step, five per food, and the headers
+    num_foods = sum(kind == "food" for kind, _ in records)
+    assert (tmp_path / "game.replay").stat().st_size == 9 + 2 * (10 + 3 * 5) + 130 + 5 * num_foods
+
+
+def test_bad_file(tmp_path):
+    path = tmp_path / "bad.replay"
+    path.write_bytes(b"not a replay")
+    with pytest.raises(ValueError):
+        list(read_replay(str(path)))
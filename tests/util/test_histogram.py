@@ -0,0 +1,42 @@
+import random
+
+import numpy as np
+import pytest
+
+from snake.util.histogram import Histogram
+
+
+def test_small_values():
+    hist = Histogram()
+    assert hist.count == 0 and hist.percentile(50) == 0
+    for value in range(1, 101):
+        hist.record(value)
+    assert hist.count == 100 and hist.max == 100
+    assert hist.percentile(50) == 50
+    assert hist.percentile(99) == 99
+    assert hist.percentile(100) == 100
+
+
+def test_precision():
+    random.seed(0)
+    hist = Histogram()
+    values = [random.randrange(10**9) for _ in range(10000)]
+    for value in values:
+        hist.record(value)
+    assert hist.max == max(values)
+    for p in (50, 95, 99):
+        exact = np.percentile(values, p, method="higher")
+        assert exact <= hist.percentile(p) <= exact * (1 + 1 / 64)
+
+
+def test_merge():
+    a, b = Histogram(), Histogram()
+    for value in range(1000):
+        (a if value % 2 else b).record(value * 1000)
+    a.merge(b)
+    assert a.count == 1000 and a.max == 999000
+    assert 499000 <= a.percentile(50) <= 499000 * (1 + 1 / 64)
+    with pytest.raises(ValueError):
+        a.merge(Histogram(sub_bits=5))
+    a.reset()
+    assert a.count == 0 and a.max == 0
@@ -0,0 +1,52 @@
+import pstats
+import signal
+import time
+
+import pytest
+
+from snake.util.profiling import PhaseTimer, Profiler
+
+
+def _busy(seconds):
+    end = time.process_time() + seconds
+    while time.process_time() < end:
+        pass
+
+
+def test_phase_timer():
+    timer = PhaseTimer("Solver")
+    for _ in range(10):
+        timer.start()
+        timer.lap("fast")
+        _busy(0.001)
+        timer.lap("slow")
+    assert timer.name == "Solver" and timer.phases == ["fast", "slow"]
+    stats = timer.stats()
+    assert stats["slow"]["count"] == 10
+    assert stats["fast"]["p50_us"] < stats["slow"]["p50_us"]
+    assert stats["slow"]["p50_us"] <= stats["slow"]["p95_us"] <= stats["slow"]["p99_us"] <= stats["slow"]["max_us"]
+    assert "slow" in timer.report()
+
+    other = PhaseTimer("Solver")
+    other.start()
+    other.lap("other")
+    timer.merge(other)
+    assert timer.phases == ["fast", "slow", "other"] and timer.histogram("other").count == 1
+
+
+def test_profiler(tmp_path):
+    pstats_path = str(tmp_path / "run.prof")
+    with Profiler(pstats_path):
+        _busy(0.01)
+    assert "_busy" in {func[2] for func in pstats.Stats(pstats_path).stats}
+
+
+@pytest.mark.skipif(not hasattr(signal, "setitimer"), reason="needs SIGPROF")
+def test_stacks(tmp_path):
+    stacks_path = tmp_path / "run.stacks"
+    with Profiler(stacks_path=str(stacks_path), interval=0.001):
+        _busy(0.1)
+    lines = stacks_path.read_text().splitlines()
+    assert lines
+    stack, num = lines[0].rsplit(" ", 1)
+    assert int(num) > 0 and "test_profiling.py:_busy" in stack
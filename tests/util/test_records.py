@@ -0,0 +1,42 @@
+import csv
+import json
+
+import pytest
+
+from snake.util.records import RecordWriter
+
+
+def test_jsonl(tmp_path):
+    path = tmp_path / "out.jsonl"
+    with RecordWriter(str(path)) as writer:
+        writer.write({"type": "episode", "steps": 10})
+        writer.write({"type": "summary", "avg_steps": 10.5})
+    lines = path.read_text().splitlines()
+    assert [json.loads(line) for line in lines] == [
+        {"type": "episode", "steps": 10},
+        {"type": "summary", "avg_steps": 10.5},
+    ]
+
+
+def test_csv(tmp_path):
+    path = tmp_path / "out.csv"
+    with pytest.raises(ValueError):
+        RecordWriter(str(path), "csv")
+    with pytest.raises(ValueError):
+        RecordWriter(str(path), "xml", ["type"])
+    with RecordWriter(str(path), "csv", ["type", "steps", "avg_steps"]) as writer:
+        writer.write({"type": "episode", "steps": 10})
+        writer.write({"type": "summary", "avg_steps": 10.5, "unknown": 1})
+    with open(path, encoding="utf-8", newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert rows == [
+        {"type": "episode", "steps": "10", "avg_steps": ""},
+        {"type": "summary", "steps": "", "avg_steps": "10.5"},
+    ]
+
+
+def test_stdout(capsys):
+    writer = RecordWriter("-")
+    writer.write({"a": 1})
+    writer.close()
+    assert json.loads(capsys.readouterr().out) == {"a": 1}
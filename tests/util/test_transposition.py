@@ -0,0 +1,36 @@
+import pytest
+
+from snake.util.transposition import TranspositionTable
+
+
+def test_get_put():
+    with pytest.raises(ValueError):
+        TranspositionTable(0)
+    table = TranspositionTable(8)
+    assert table.capacity == 8 and len(table) == 0
+    assert table.get(3) is None and table.get(3, 0) == 0
+    assert table.put(3, "a")
+    assert 3 in table and len(table) == 1
+    assert table.get(3) == "a"
+    assert table.put(3, "b")
+    assert table.get(3) == "b" and len(table) == 1
+    assert table.hits == 2 and table.misses == 2
+    table.clear()
+    assert len(table) == 0 and 3 not in table and table.hits == 0
+
+
+def test_replacement():
+    table = TranspositionTable(8)
+    assert table.put(1, "deep", depth=5)
+    assert table.depth(1) == 5 and table.depth(2) == -1
+
+    # 9 shares the slot of 1 and is kept out by the deeper entry
+    assert not table.put(9, "shallow", depth=2)
+    assert table.get(1) == "deep" and 9 not in table
+    assert table.put(9, "deeper", depth=5)
+    assert table.get(9) == "deeper" and 1 not in table and len(table) == 1
+
+    # Entries of an older search can always be replaced
+    table.new_search()
+    assert table.put(1, "new", depth=0)
+    assert table.get(1) == "new" and 9 not in table
@@ -0,0 +1,256 @@
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from snake.base.direc import Direc
+from snake.base.map import Map
+from snake.base.point import PointType
+from snake.base.snake import Snake
+from snake.solver.cycle import reverse_cycle, zigzag_cycle
+from snake.solver.greedy import GreedySolver
+from snake.solver.hamilton import HamiltonSolver
+from snake.solver.path import PathSolver
+from snake.util.records import FORMATS, RecordWriter
+
+# Body type of a cell linked to its neighbors in these two directions
+_BODY_TYPES = {
+    frozenset((Direc.LEFT, Direc.RIGHT)): PointType.BODY_HOR,
+    frozenset((Direc.UP, Direc.DOWN)): PointType.BODY_VER,
+    frozenset((Direc.LEFT, Direc.UP)): PointType.BODY_LU,
+    frozenset((Direc.UP, Direc.RIGHT)): PointType.BODY_UR,
+    frozenset((Direc.RIGHT, Direc.DOWN)): PointType.BODY_RD,
+    frozenset((Direc.DOWN, Direc.LEFT)): PointType.BODY_DL,
+}
+_HEAD_TYPES = {
+    Direc.LEFT: PointType.HEAD_L,
+    Direc.UP: PointType.HEAD_U,
+    Direc.RIGHT: PointType.HEAD_R,
+    Direc.DOWN: PointType.HEAD_D,
+}
+
+# Number of calls traced for the allocations, which tracemalloc slows down a lot
+_ALLOC_CALLS = 10
+
+_FIELDS = [
+    "type",
+    "op",
+    "size",
+    "fill",
+    "calls",
+    "mean_us",
+    "p50_us",
+    "p95_us",
+    "max_us",
+    "alloc_kib",
+    "exponent",
+    "r2",
+]
+
+
+def make_state(size, fill, seed):
+    """Build a size x size game with the snake covering a fraction of it, lying on a zig-zag cycle.
+
+    Returns:
+        The base.snake.Snake, whose map has a food placed at random.
+
+    """
+    rng = random.Random(seed)
+    num_rows = num_cols = size + 2
+    game_map = Map(num_rows, num_cols)
+    pred = reverse_cycle(zigzag_cycle(num_rows, num_cols))
+    length = max(2, min(int(fill * size * size), size * size - 1))
+
+    cells = [rng.choice([cell for cell in range(len(pred)) if pred[cell] >= 0])]
+    for _ in range(length - 1):
+        cells.append(pred[cells[-1]])
+    bodies = [game_map.pos(cell) for cell in cells]
+
+    # Directions from every body to the one before it, towards the head
+    direcs = [bodies[i + 1].direc_to(bodies[i]) for i in range(length - 1)]
+    types = [_HEAD_TYPES[direcs[0]]]
+    for i in range(1, length - 1):
+        types.append(_BODY_TYPES[frozenset((direcs[i - 1], Direc.opposite(direcs[i])))])
+    types.append(PointType.BODY_HOR if direcs[-1] in (Direc.LEFT, Direc.RIGHT) else PointType.BODY_VER)
+
+    snake = Snake(game_map, direcs[0], bodies, types)
+    random.seed(seed)
+    game_map.create_rand_food()
+    return snake
+
+
+def _latencies(func, calls):
+    """Return the seconds each of the calls to a function took."""
+    times = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def _peak(func, *args):
+    """Call a function while tracemalloc runs and return its result and the peak bytes it allocated."""
+    before = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    result = func(*args)
+    return result, tracemalloc.get_traced_memory()[1] - before
+
+
+def _play(snake, solver, steps, trace=False):
+    """Let a solver play some steps and return the costs of its next_direc() and Snake.move() calls.
+
+    Returns:
+        Two lists, of the seconds or with trace of the peak bytes allocated
+        by every call.
+
+    """
+    game_map = snake.map
+    solver_costs, move_costs = [], []
+    if trace:
+        tracemalloc.start()
+    try:
+        for _ in range(steps):
+            if not game_map.has_food():
+                game_map.create_rand_food()
+            if snake.dead or game_map.is_full():
+                break
+            if trace:
+                direc, solver_cost = _peak(solver.next_direc)
+                _, move_cost = _peak(snake.move, direc)
+            else:
+                start = time.perf_counter()
+                direc = solver.next_direc()
+                mid = time.perf_counter()
+                snake.move(direc)
+                solver_cost, move_cost = mid - start, time.perf_counter() - mid
+            solver_costs.append(solver_cost)
+            move_costs.append(move_cost)
+    finally:
+        if trace:
+            tracemalloc.stop()
+    return solver_costs, move_costs
+
+
+def measure(size, fill, calls, steps, seed):
+    """Measure every operation on one board size and fill ratio.
+
+    Returns:
+        A dict of {op: (latencies in seconds, peak bytes allocated by one call)}.
+
+    """
+    results = {}
+
+    snake = make_state(size, fill, seed)
+    path_solver = PathSolver(snake)
+    food = snake.map.food
+    for op, func in (
+        ("shortest_path_to", lambda: path_solver.shortest_path_to(food)),
+        ("longest_path_to", lambda: path_solver.longest_path_to(food)),
+    ):
+        times = _latencies(func, calls)
+        tracemalloc.start()
+        try:
+            results[op] = (times, max(_peak(func)[1] for _ in range(min(calls, _ALLOC_CALLS))))
+        finally:
+            tracemalloc.stop()
+
+    for op, solver_cls, kwargs in (
+        ("greedy.next_direc", GreedySolver, {}),
+        ("hamilton.next_direc", HamiltonSolver, {"cycle": "zigzag"}),
+    ):
+        # Time a run, then replay its first steps to trace the allocations
+        runs = []
+        for trace, num_steps in ((False, steps), (True, min(steps, _ALLOC_CALLS))):
+            snake = make_state(size, fill, seed)
+            runs.append(_play(snake, solver_cls(snake, **kwargs), num_steps, trace))
+        (solver_times, move_times), (solver_allocs, move_allocs) = runs
+        results[op] = (solver_times, max(solver_allocs, default=0))
+        if op == "greedy.next_direc":
+            results["snake.move"] = (move_times, max(move_allocs, default=0))
+    return results
+
+
+def fit_exponent(sizes, values):
+    """Fit values ~ c * cells ** k on a log-log scale and return k and the r squared of the fit."""
+    x, y = np.log(np.square(sizes)), np.log(values)
+    k, c = np.polyfit(x, y, 1)
+    residual = y - (k * x + c)
+    total = np.sum((y - y.mean()) ** 2)
+    return float(k), float(1 - np.sum(residual**2) / total) if total > 0 else 1.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure how solver queries scale with the board size.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[8, 16, 32, 64, 128], help="even board sizes")
+    parser.add_argument("--fills", type=float, nargs="+", default=[0.1, 0.3, 0.5], help="snake fill ratios")
+    parser.add_argument("--calls", type=int, default=10, help="calls of every path query per board")
+    parser.add_argument("--steps", type=int, default=50, help="steps every solver plays per board")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the snake and food placement")
+    parser.add_argument("--output", help="file to write the records to, '-' for stdout")
+    parser.add_argument("--format", default="jsonl", choices=FORMATS, help="format of the records")
+    parser.add_argument(
+        "--max-exponent",
+        type=float,
+        help="exit with an error if the latency of an operation grows faster than cells ** max-exponent",
+    )
+    args = parser.parse_args()
+    if any(size % 2 for size in args.sizes):
+        parser.error("board sizes must be even")
+
+    writer = RecordWriter(args.output, args.format, _FIELDS) if args.output else None
+    out = sys.stderr if args.output == "-" else sys.stdout  # Keep the table out of records on stdout
+    means = {}  # (op, fill) -> (size, mean latency) of every size
+    columns = ["mean_us", "p50_us", "p95_us", "max_us", "alloc_kib"]
+    print(f"{'op':<22}{'size':>6}{'fill':>6}{'calls':>7}" + "".join(f"{col:>12}" for col in columns), file=out)
+    for fill in args.fills:
+        for size in args.sizes:
+            for op, (times, alloc) in measure(size, fill, args.calls, args.steps, args.seed).items():
+                if not times:
+                    continue
+                times_us = np.array(times) * 1e6
+                row = {
+                    "type": "measure",
+                    "op": op,
+                    "size": size,
+                    "fill": fill,
+                    "calls": len(times),
+                    "mean_us": float(times_us.mean()),
+                    "p50_us": float(np.percentile(times_us, 50)),
+                    "p95_us": float(np.percentile(times_us, 95)),
+                    "max_us": float(times_us.max()),
+                    "alloc_kib": alloc / 1024,
+                }
+                means.setdefault((op, fill), []).append((size, row["mean_us"]))
+                print(
+                    f"{op:<22}{size:>6}{fill:>6}{row['calls']:>7}" + "".join(f"{row[col]:>12.1f}" for col in columns),
+                    file=out,
+                )
+                if writer:
+                    writer.write(row)
+
+    print(f"\n{'op':<22}{'fill':>6}{'exponent':>10}{'r2':>8}   (mean latency ~ cells ** exponent)", file=out)
+    too_steep = []
+    for (op, fill), points in means.items():
+        if len(points) < 2:
+            continue
+        sizes, values = zip(*points)
+        exponent, r2 = fit_exponent(sizes, values)
+        print(f"{op:<22}{fill:>6}{exponent:>10.2f}{r2:>8.2f}", file=out)
+        if writer:
+            writer.write({"type": "fit", "op": op, "fill": fill, "exponent": exponent, "r2": r2})
+        if args.max_exponent is not None and exponent > args.max_exponent:
+            too_steep.append(f"{op} (fill {fill}): {exponent:.2f}")
+
+    if writer:
+        writer.close()
+    if too_steep:
+        print(f"\nGrowing faster than cells ** {args.max_exponent}: " + ", ".join(too_steep), file=out)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()